@@ -1,5 +1,6 @@
 {
     "name": "API Connector",
+    "version": "16.0.1.1",
     "website": "https://www.odoo.com",
     "author": "Odoo Inc.",
     "summary": "This app will be use to connect to a rest end point and fetch the desired request and response data",
@@ -12,6 +13,10 @@
         "views/postman_view_button.xml",
         "views/postman_export_view.xml",
         "views/postman_import_export_buttons.xml",
+        "views/api_connector_job_view.xml",
+        "views/api_connector_metric_view.xml",
+        "views/api_connector_call_view.xml",
+        "data/api_connector_cron.xml",
         "security/api_connector_groups.xml",
         "security/ir.model.access.csv",
     ],
@@ -2,6 +2,7 @@ from odoo import api, fields, models
 
 class AddToURL(models.Model):
     _name = 'add.to.url'
+    _inherit = ['api.connector.line.mixin']
     _description = 'Add parameters to URL'
 
     api_connector_id = fields.Many2one(
@@ -1,11 +1,51 @@
-from urllib.parse import urlencode
-from odoo import api, fields, models
+from urllib.parse import urlencode, urlsplit
+from collections import namedtuple
+from odoo import api, fields, models, tools
 from odoo.exceptions import UserError
-import requests
+from psycopg2 import sql
 import json
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 import base64
 import validators
 
+from .async_transport import async_transport
+from .body_template import compile_body, encode_json, encode_text
+from .compression import (
+    LimitedSession, compress_text, decompress_text, encoding_available, prepare_outgoing,
+)
+from .call_log import call_log_buffer, make_entry
+from .execution_context import ExecutionContext
+from .http_session import session_registry
+from .metrics import metrics_registry
+from .oauth_token import ADVISORY_LOCK_NAMESPACE, REFRESH_MARGIN, OAuthToken, token_cache
+from .rate_limiter import RateLimiter
+from .resilience import RetryPolicy, breaker_registry, guarded, guarded_async
+from .response_cache import CacheEntry, is_fresh, response_cache
+from .response_flattener import flatten_response
+from .response_path import compile_path, extract_paths
+from .sync_watermark import parse_watermark
+
+RequestTemplate = namedtuple('RequestTemplate', ['headers', 'parameters', 'url_segments', 'dynamic_fields', 'mappings',
+                                                 'response_paths', 'body', 'variables'])
+
+# Fields read by _get_request_template; writing anything else keeps the compiled template
+TEMPLATE_FIELDS = {'header_line', 'parameter_line', 'add_to_url_line', 'fields_lines', 'flatten_mode',
+                   'request_body', 'request_variables', 'body_format', 'request_method'}
+
+# Fields whose change makes the cached OAuth access token stale
+OAUTH_FIELDS = {'bearer_token', 'oauth_client_id', 'oauth_client_secret', 'oauth_access_token_url',
+                'oauth_grant_type', 'oauth_scope'}
+
+# First key of the Postgres advisory lock held by a running sync
+SYNC_LOCK_NAMESPACE = 7341
+
+_logger = logging.getLogger(__name__)
+
 
 class ApiConnector(models.Model):
     _name = 'api.connector'
@@ -39,8 +79,26 @@ class ApiConnector(models.Model):
     request_type = fields.Selection(
         [('GET', 'GET'), ('PUT', 'PUT'), ('POST', 'POST'), ('PATCH', 'PATCH'), ('DELETE', 'DELETE')],
         string='Request Type', default="GET")
-    request_body = fields.Text('Request Body')
-    response = fields.Text('Response', readonly=True)
+    request_body = fields.Text('Request Body',
+                               help="For REST calls, {{ field }} and {{ relation.field }} placeholders are filled "
+                                    "from the event record.")
+    body_format = fields.Selection([('json', 'JSON'), ('text', 'Text')], string='Body Format', default='json',
+                                   required=True,
+                                   help="JSON encodes every placeholder value as a JSON literal; Text inserts it as is.")
+    request_variables = fields.Text('GraphQL Variables',
+                                    help="JSON object of query variables; {{ field }} placeholders are filled "
+                                         "from the event record.")
+    response = fields.Text('Response', readonly=True, compute='_compute_response')
+    response_compressed = fields.Binary('Compressed Response', attachment=False, readonly=True)
+    response_storage = fields.Selection(
+        [('full', 'Full'), ('truncated', 'Truncated'), ('none', 'Do Not Store')], string='Store Response',
+        default='full', required=True)
+    response_max_length = fields.Integer('Stored Response Length', default=10000)
+    flatten_mode = fields.Selection(
+        [('merge', 'Merge List Items'), ('path', 'Dotted Key Paths'), ('none', 'Keep Structure (Path Expressions)')],
+        string='Response Keys', default='merge', required=True,
+        help="How the response is flattened before the value mapping looks up its keys. When the structure is "
+             "kept, mapping values are path expressions such as $.items[0].id or items.*.id.")
     authorization = fields.Selection(
         [('No Auth', 'No Auth'), ('Bearer', 'Bearer'), ('Basic Auth', 'Basic Auth'), ('O Auth 2', 'O Auth 2')],
         string='Authorization', default="No Auth")
@@ -52,8 +110,116 @@ class ApiConnector(models.Model):
     oauth_client_secret = fields.Char('Client Secret')
     oauth_redirect_uri = fields.Char('Redirect URL')
     oauth_access_token_url = fields.Char('Access Token URL')
-    request_func = {'GET': requests.get, 'PUT': requests.put, 'POST': requests.post, 'PATCH': requests.patch,
-                    'DELETE': requests.delete}
+    oauth_grant_type = fields.Selection(
+        [('authorization_code', 'Authorization Code'), ('client_credentials', 'Client Credentials')],
+        string='Grant Type', default='authorization_code')
+    oauth_scope = fields.Char('Scope')
+    oauth_token_expiry = fields.Datetime('Token Expiry', compute='_compute_oauth_token_expiry')
+    pool_size = fields.Integer('Connection Pool Size', default=10)
+    keep_alive = fields.Boolean('Keep Alive', default=True)
+    connect_timeout = fields.Float('Connect Timeout (s)', default=10.0)
+    read_timeout = fields.Float('Read Timeout (s)', default=30.0)
+    max_retries = fields.Integer('Connection Retries', default=0,
+                                 help="Retries on connection errors of the OAuth token calls, handled by the "
+                                      "pooled session adapter. Requests are retried by the retry policy.")
+    execution_mode = fields.Selection(
+        [('immediate', 'Immediate'), ('deferred', 'Deferred')], string='Execution Mode', default='immediate',
+        required=True, help="Deferred triggers only enqueue a job; a scheduled action performs the call later.")
+    job_priority = fields.Integer('Job Priority', default=10)
+    job_max_attempts = fields.Integer('Max Attempts', default=5)
+    job_backoff_seconds = fields.Integer('Retry Backoff (s)', default=60)
+    job_ids = fields.One2many('api.connector.job', 'connector_id', string='Queued Calls')
+    cache_enabled = fields.Boolean('Cache GET Responses')
+    cache_ttl = fields.Integer('Cache TTL (s)', default=300)
+    cache_shared = fields.Boolean('Share Cache Between Workers',
+                                  help="Also keep cached responses in the database so every worker can reuse them.")
+    max_concurrency = fields.Integer('Max Concurrent Requests', default=8,
+                                     help="Upper bound on parallel requests when a trigger fires for many records.")
+    transport = fields.Selection(
+        [('sync', 'Blocking (requests)'), ('async', 'Asynchronous (httpx)')], string='Transport', default='sync',
+        required=True,
+        help="The asynchronous transport sends batches from one event loop per worker instead of one thread per "
+             "request, so many more calls can be in flight at once. It needs the httpx package.")
+    accept_encoding = fields.Selection(
+        [('identity', 'None'), ('gzip', 'gzip'), ('br', 'Brotli'), ('zstd', 'Zstandard')],
+        string='Accepted Response Encoding', default='gzip', required=True,
+        help="Compressions offered to the server; Brotli and Zstandard need their Python packages.")
+    compress_request_body = fields.Boolean('Gzip Request Body',
+                                           help="Only for servers accepting Content-Encoding: gzip requests.")
+    max_response_size = fields.Integer('Max Response Size (KB)', default=0,
+                                       help="Responses are streamed and abandoned past this decoded size; "
+                                            "0 means no limit.")
+    http2 = fields.Boolean('HTTP/2', help="Multiplex the requests of the asynchronous transport over HTTP/2 "
+                                          "connections (needs the h2 package).")
+    retry_max_attempts = fields.Integer('Request Attempts', default=1, help="1 means the request is never retried.")
+    retry_statuses = fields.Char('Retry On Statuses', default='500,502,503,504')
+    retry_on_errors = fields.Boolean('Retry On Connection Errors', default=True)
+    retry_backoff = fields.Float('Backoff (s)', default=0.5, help="Base delay, doubled on every attempt, with jitter.")
+    retry_backoff_max = fields.Float('Max Backoff (s)', default=30.0)
+    retry_deadline = fields.Float('Overall Deadline (s)', help="Stop retrying after this time; 0 means no deadline.")
+    breaker_threshold = fields.Integer('Open Circuit After',
+                                       help="Consecutive failures opening the circuit breaker; 0 disables it.")
+    breaker_cooldown = fields.Integer('Circuit Cooldown (s)', default=60)
+    breaker_state = fields.Selection([('closed', 'Closed'), ('open', 'Open'), ('half_open', 'Half Open')],
+                                     string='Circuit State', compute='_compute_breaker_state',
+                                     help="State of the circuit breaker in the worker serving this page.")
+    breaker_failures = fields.Integer('Consecutive Failures', compute='_compute_breaker_state')
+    breaker_open_until = fields.Datetime('Suspended Until', compute='_compute_breaker_state')
+    log_failures = fields.Boolean('Log Failed Calls', default=True)
+    log_success_rate = fields.Float('Successful Calls Logged', default=0.01,
+                                    help="Share of successful calls kept in the call log, from 0 to 1.")
+    log_body_limit = fields.Integer('Logged Body Size (bytes)', default=2048,
+                                    help="Response bodies are cut to this size and compressed; 0 keeps no body.")
+    call_ids = fields.One2many('api.connector.call', 'connector_id', string='Call Log')
+    rate_limit = fields.Float('Rate Limit (requests/s)', help="Shared by every worker; 0 disables rate limiting.")
+    rate_limit_burst = fields.Integer('Burst', default=1)
+    rate_limit_scope = fields.Selection([('connector', 'Per Connector'), ('host', 'Per Host')], string='Limit Scope',
+                                        default='connector', required=True)
+    max_in_flight = fields.Integer('Max In-Flight (All Workers)',
+                                   help="Cap on simultaneous requests across every worker; 0 means no cap.")
+    rate_limit_max_wait = fields.Integer('Max Throttle Wait (s)', default=60,
+                                         help="Longest a request waits for the rate limit, a free slot or a "
+                                              "Retry-After before failing; 0 waits as long as asked.")
+    batch_mode = fields.Selection(
+        [('off', 'One Request per Record'), ('json_array', 'JSON Array'), ('graphql_batch', 'GraphQL Batch')],
+        string='Bulk Requests', default='off', required=True,
+        help="Send the event records of a trigger together, as one payload per chunk.")
+    batch_chunk_size = fields.Integer('Records per Request', default=100)
+    batch_wrapper_key = fields.Char('Payload Key', help="Wrap the JSON array in an object under this key.")
+    batch_response_path = fields.Char('Response Items Path', help="Path to the list of results in the response.")
+    batch_match_key = fields.Char('Match Key',
+                                  help="Key present in request and response items used to pair them; "
+                                       "without it results are paired by position.")
+    pagination_mode = fields.Selection(
+        [('none', 'No Pagination'), ('page', 'Page Number'), ('offset', 'Offset'), ('cursor', 'Cursor / Next Token'),
+         ('link', 'Link Header'), ('graphql', 'GraphQL pageInfo')],
+        string='Pagination', default='none', required=True)
+    pagination_param = fields.Char('Page Parameter',
+                                   help="Query parameter (or GraphQL variable) carrying the page, offset or cursor.")
+    pagination_size_param = fields.Char('Page Size Parameter')
+    pagination_page_size = fields.Integer('Page Size', default=100)
+    pagination_start = fields.Integer('First Page', default=1)
+    pagination_start_offset = fields.Integer('First Offset', default=0)
+    pagination_items_path = fields.Char('Items Path', help="Path to the list of items in a page, e.g. data.orders")
+    pagination_cursor_path = fields.Char('Cursor Path',
+                                         help="Path to the next cursor, or to the pageInfo object for GraphQL.")
+    pagination_max_pages = fields.Integer('Max Pages', default=100)
+    pagination_max_items = fields.Integer('Max Items', default=10000)
+    pagination_batch_size = fields.Integer('Apply Batch Size', default=100)
+    sync_enabled = fields.Boolean('Scheduled Sync')
+    sync_interval = fields.Integer('Sync Every (minutes)', default=60)
+    sync_last_run = fields.Datetime('Last Sync', readonly=True)
+    sync_watermark = fields.Char('High-Water Mark', help="Last timestamp or cursor received by the scheduled sync.")
+    sync_watermark_type = fields.Selection(
+        [('timestamp', 'Highest Item Value'), ('cursor', 'Response Cursor')], string='Mark Source',
+        default='timestamp', required=True)
+    sync_watermark_path = fields.Char('Mark Path', help="Path to the mark in each item (highest value wins) "
+                                                        "or in the response for a cursor.")
+    sync_watermark_param = fields.Char('Mark Parameter',
+                                       help="Query parameter (or GraphQL variable) sending the stored mark.")
+    sync_external_id_path = fields.Char('External ID Path', help="Path to the item key matched against the target.")
+    sync_external_id_field_id = fields.Many2one('ir.model.fields', string='External ID Field', ondelete='set null',
+                                                domain="[('model_id', '=', target_model_id), ('store', '=', True)]")
     response_handler_update_key = fields.Char()
     response_handler_update_value = fields.Char()
     response_event_record = fields.Reference(
@@ -68,67 +234,721 @@ class ApiConnector(models.Model):
 
     @api.depends('url')
     def send_request(self, event_record=None):
-        PARAMS = {}
-        HEADERS = {}
+        # manual call: keep the response on the connector so it can be inspected and mapped later
+        context = self._send_request(event_record)
         if event_record is not None:
             self.response_event_record = event_record
-        headers_dict = self._get_request_headers(event_record)
-        parameters_dict = self._get_request_parameters(event_record)
-        url_to_call = self._add_to_url(event_record)
+        self._store_response(context.response_object)
+
+    def _send_request(self, event_record=None):
+        """ Send the request and return its execution context; nothing is written on the connector. """
+        with metrics_registry.timer(self.env.cr.dbname, self.id, 'prepare'):
+            request_kwargs = self._prepare_request(event_record)
+        return ExecutionContext(event_record, self._execute_requests([request_kwargs])[0])
+
+    def send_request_batch(self, event_records):
+        """ Send one request per event record concurrently and return their execution contexts. """
+        self.ensure_one()
+        # ORM access is not thread safe: every request is fully built before the pool starts
+        with metrics_registry.timer(self.env.cr.dbname, self.id, 'prepare'):
+            self._prefetch_template_fields(event_records)
+            values_by_id = self._get_dynamic_values(event_records)
+            prepared = [(record, self._prepare_request(record, values_by_id.get(record.id))) for record in event_records]
+        if not prepared:
+            return []
+        parsed_responses = self._execute_requests([request_kwargs for _record, request_kwargs in prepared])
+        return [ExecutionContext(record, parsed) for (record, _kwargs), parsed in zip(prepared, parsed_responses)]
+
+    def send_request_bulk(self, event_records):
+        """ Send the event records as bulk payloads of at most batch_chunk_size items and return their contexts. """
+        self.ensure_one()
+        with metrics_registry.timer(self.env.cr.dbname, self.id, 'prepare'):
+            base_kwargs = self._prepare_request(None)
+            if self.request_method == "REST":
+                # per-record parameters travel in the payload items; only the static ones stay in the query
+                base_kwargs['params'] = {
+                    key: static_value
+                    for key, static_value, position in self._get_request_template().parameters if position is None
+                }
+                base_kwargs.pop('data', None)
+            self._prefetch_template_fields(event_records)
+            values_by_id = self._get_dynamic_values(event_records)
+            chunks = []
+            for chunk in tools.split_every(self.batch_chunk_size or 100, event_records):
+                items = [self._get_bulk_item(record, values_by_id.get(record.id)) for record in chunk]
+                chunks.append((chunk, items, dict(base_kwargs, json=self._get_bulk_payload(items))))
+        responses = self._execute_requests([request_kwargs for _chunk, _items, request_kwargs in chunks], raw=True)
+        contexts = []
+        for (chunk, items, _request_kwargs), response in zip(chunks, responses):
+            for record, response_item in zip(chunk, self._demultiplex_bulk_response(items, response)):
+                contexts.append(ExecutionContext(record, flatten_response(response_item, self.flatten_mode)))
+        return contexts
+
+    def _get_bulk_item(self, event_record, values=None):
+        if self.batch_mode == 'graphql_batch':
+            return self._get_graphql_payload(event_record, values)
+        if self._get_request_template().body is not None and self.body_format == 'json':
+            try:
+                return json.loads(self._render_body(event_record))
+            except ValueError as e:
+                raise UserError("The request body of %s is not valid JSON once rendered\n%s" % (self.name, e))
+        return self._get_request_parameters(event_record, values)
+
+    def _get_bulk_payload(self, items):
+        if self.batch_wrapper_key and self.batch_mode == 'json_array':
+            return {self.batch_wrapper_key: items}
+        return items
+
+    def _demultiplex_bulk_response(self, items, response):
+        """ Return the response item of every request item, matched by position or by the match key. """
+        response_items = self._extract_page_value(response, self.batch_response_path) \
+            if self.batch_response_path else response
+        if not isinstance(response_items, list):
+            raise UserError("The bulk response of %s does not contain a list of items" % self.name)
+        if self.batch_match_key:
+            if self.batch_mode == 'graphql_batch':
+                items = [item.get("variables") or {} for item in items]
+            by_key = {}
+            for response_item in response_items:
+                key = self._extract_page_value(response_item, self.batch_match_key)
+                by_key[str(key)] = response_item
+            missing = [item for item in items if str(item.get(self.batch_match_key)) not in by_key]
+            if missing:
+                raise UserError("The bulk response of %s has no item for %s = %s" % (
+                    self.name, self.batch_match_key, missing[0].get(self.batch_match_key)))
+            return [by_key[str(item.get(self.batch_match_key))] for item in items]
+        if len(response_items) != len(items):
+            raise UserError("The bulk response of %s has %s items for %s records" % (
+                self.name, len(response_items), len(items)))
+        return response_items
+
+    def _store_response(self, response_object):
+        if self.response_storage == 'none':
+            return
+        if self.response_storage == 'truncated':
+            response_text = json.dumps(response_object)
+            limit = self.response_max_length
+            if limit and len(response_text) > limit:
+                response_text = response_text[:limit] + '\n... (truncated)'
+        else:
+            response_text = json.dumps(response_object, indent=4)
+        self.response_compressed = compress_text(response_text)
+
+    @api.depends('response_compressed')
+    def _compute_response(self):
+        # only decompressed when the response is displayed or used; forms read binaries as sizes with bin_size
+        for connector in self:
+            connector.response = decompress_text(connector.with_context(bin_size=False).response_compressed)
+
+    def _execute_requests(self, requests_kwargs, raw=False):
+        """ Perform prepared requests, answering from the response cache when possible, and return parsed bodies.
+
+        With ``raw`` the bodies are returned as decoded, without flattening nor caching.
+        """
+        results = [None] * len(requests_kwargs)
+        pending = []
+        for index, request_kwargs in enumerate(requests_kwargs):
+            cache_key, cache_entry = self._lookup_cached_response(request_kwargs) if not raw else (None, None)
+            if is_fresh(cache_entry):
+                results[index] = cache_entry.payload
+            else:
+                pending.append((index, request_kwargs, cache_key, cache_entry))
+        responses = self._dispatch_requests([request_kwargs for _index, request_kwargs, _key, _entry in pending])
+        for (index, _request_kwargs, cache_key, cache_entry), r in zip(pending, responses):
+            if cache_entry is not None and r.status_code == 304:
+                results[index] = self._store_cached_response(cache_key, r, cache_entry.payload, cache_entry)
+                continue
+            results[index] = self._parse_json(r) if raw else self._parse_response(r)
+            if cache_key:
+                self._store_cached_response(cache_key, r, results[index])
+        self._flush_telemetry()
+        return results
+
+    def _flush_telemetry(self):
+        self.env['api.connector.metric'].sudo()._flush_worker_metrics()
+        self.env['api.connector.call'].sudo()._flush_worker_logs()
+
+    def _dispatch_requests(self, requests_kwargs):
+        if not requests_kwargs:
+            return []
+        url = requests_kwargs[0]['url']
+        if self.transport == 'async' and len(requests_kwargs) > 1 and self._get_rate_limiter(url) is None:
+            # every request goes out from the event loop; no thread is held per request
+            return async_transport.gather(self._get_async_sender(url), requests_kwargs,
+                                          max(1, self.max_concurrency or len(requests_kwargs)))
+        send = self._get_http_sender(url)
+        if len(requests_kwargs) == 1:
+            return [send(requests_kwargs[0])]
+        max_workers = max(1, min(self.max_concurrency or 1, len(requests_kwargs)))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='api_connector') as executor:
+            return list(executor.map(send, requests_kwargs))
+
+    def _get_transport_session(self, url):
+        max_bytes = self.max_response_size * 1024
+        if self.transport == 'async':
+            return async_transport.session(pool_size=self.pool_size or 10, http2=self.http2,
+                                           keep_alive=self.keep_alive, max_bytes=max_bytes)
+        # the retry policy is the only retry layer of requests, the session adapter must not retry underneath it
+        session = self._get_session(url, max_retries=0)
+        return LimitedSession(session, max_bytes) if max_bytes else session
+
+    def _get_outgoing_preparer(self):
+        """ Return a thread-safe callable applying the encoding settings to prepared requests. """
+        accept_encoding, compress_body = self.accept_encoding, self.compress_request_body
+        return lambda request_kwargs: prepare_outgoing(request_kwargs, accept_encoding, compress_body)
+
+    def _get_http_sender(self, url):
+        """ Return a thread-safe callable sending prepared requests through the pooled session and limits. """
+        session = self._get_transport_session(url)
+        limiter = self._get_rate_limiter(url)
+        if limiter is None:
+            send = lambda request_kwargs: session.request(**request_kwargs)
+        else:
+            send = lambda request_kwargs: limiter.request(session, request_kwargs)
+        send = guarded(send, self.name, self._get_retry_policy(), self._get_circuit_breaker())
+        record = self._get_call_recorder()
+        prepare = self._get_outgoing_preparer()
+
+        def send_instrumented(request_kwargs):
+            start = time.perf_counter()
+            r = error = None
+            try:
+                r = send(prepare(request_kwargs))
+                return r
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                record(request_kwargs, r, error, start)
+        return send_instrumented
+
+    def _get_async_sender(self, url):
+        """ Coroutine counterpart of _get_http_sender, run on the asynchronous transport's event loop. """
+        options = {'pool_size': self.pool_size or 10, 'http2': self.http2, 'keep_alive': self.keep_alive,
+                   'max_bytes': self.max_response_size * 1024}
+        send = guarded_async(lambda request_kwargs: async_transport.request(request_kwargs, **options),
+                             self.name, self._get_retry_policy(), self._get_circuit_breaker())
+        record = self._get_call_recorder()
+        prepare = self._get_outgoing_preparer()
+
+        async def send_instrumented(request_kwargs):
+            start = time.perf_counter()
+            r = error = None
+            try:
+                r = await send(prepare(request_kwargs))
+                return r
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                record(request_kwargs, r, error, start)
+        return send_instrumented
+
+    def _get_call_recorder(self):
+        """ Return a thread-safe callable recording the timings and sampled call log of one request. """
+        dbname, connector_id = self.env.cr.dbname, self.id
+        log_failures, log_success_rate, log_body_limit = self.log_failures, self.log_success_rate, self.log_body_limit
+
+        def record(request_kwargs, r, error, start):
+            duration_ms = (time.perf_counter() - start) * 1000
+            metrics_registry.observe(dbname, connector_id, 'http', duration_ms)
+            if r is not None:
+                # time to response headers: connection setup, TLS and server time
+                metrics_registry.observe(dbname, connector_id, 'server', r.elapsed.total_seconds() * 1000)
+            failed = r is None or r.status_code >= 400
+            if (log_failures if failed else random.random() < log_success_rate):
+                call_log_buffer.append(
+                    dbname, make_entry(connector_id, request_kwargs, r, error, duration_ms, log_body_limit))
+        return record
+
+    def _get_retry_policy(self):
+        statuses = [int(status) for status in (self.retry_statuses or '').replace(' ', '').split(',') if status]
+        return RetryPolicy(statuses=statuses, retry_exceptions=self.retry_on_errors,
+                           max_attempts=self.retry_max_attempts, backoff=self.retry_backoff,
+                           backoff_max=self.retry_backoff_max, deadline=self.retry_deadline)
+
+    def _get_circuit_breaker(self):
+        if not self.breaker_threshold:
+            return None
+        return breaker_registry.get((self.env.cr.dbname, self.id), self.breaker_threshold, self.breaker_cooldown)
+
+    def _compute_breaker_state(self):
+        for connector in self:
+            breaker = breaker_registry.peek((connector.env.cr.dbname, connector.id))
+            if breaker is None:
+                connector.breaker_state = 'closed'
+                connector.breaker_failures = 0
+                connector.breaker_open_until = False
+                continue
+            connector.breaker_state = breaker.state
+            connector.breaker_failures = breaker.failures
+            connector.breaker_open_until = breaker.open_until and datetime.utcfromtimestamp(breaker.open_until)
+
+    def action_reset_breaker(self):
+        for connector in self:
+            breaker = breaker_registry.peek((connector.env.cr.dbname, connector.id))
+            if breaker is not None:
+                breaker.reset()
+
+    def _get_rate_limiter(self, url):
+        if not (self.rate_limit or self.max_in_flight):
+            return None
+        if self.rate_limit_scope == 'host':
+            key = 'host:' + urlsplit(url).netloc
+        else:
+            key = 'connector:%s' % self.id
+        connect_timeout, read_timeout = self._get_timeout()
+        # a slot lease outlives the slowest request it can cover
+        lease_time = (connect_timeout or 0) + (read_timeout or 0) + 60 if read_timeout else 300
+        return RateLimiter(self.env.cr.dbname, key, rate=self.rate_limit, burst=self.rate_limit_burst,
+                           max_in_flight=self.max_in_flight, max_wait=self.rate_limit_max_wait,
+                           lease_time=lease_time)
+
+    def _lookup_cached_response(self, request_kwargs):
+        if not (self.cache_enabled and request_kwargs['method'] == 'GET'):
+            return None, None
+        key = response_cache.make_key(self.env.cr.dbname, self.id, request_kwargs, self.flatten_mode)
+        entry = response_cache.get(key)
+        if entry is None and self.cache_shared:
+            entry = self.env['api.connector.cache.entry'].sudo()._get_entry(key[2])
+            if entry is not None:
+                response_cache.put(key, entry)
+        response_cache.record(hit=is_fresh(entry))
+        if entry is not None and not is_fresh(entry):
+            headers = request_kwargs.setdefault('headers', {})
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        return key, entry
+
+    def _store_cached_response(self, key, r, payload, previous_entry=None):
+        if 'no-store' in r.headers.get('Cache-Control', ''):
+            return payload
+        entry = CacheEntry(
+            expires_at=time.time() + (self.cache_ttl or 0),
+            etag=r.headers.get('ETag') or (previous_entry and previous_entry.etag),
+            last_modified=r.headers.get('Last-Modified') or (previous_entry and previous_entry.last_modified),
+            payload=payload,
+        )
+        if previous_entry is not None:
+            response_cache.record_revalidation()
+        response_cache.put(key, entry)
+        if self.cache_shared:
+            self.env['api.connector.cache.entry'].sudo()._put_entry(self.id, key[2], entry)
+        return payload
+
+    @api.model
+    def get_cache_stats(self):
+        return response_cache.stats()
+
+    def action_clear_response_cache(self):
+        response_cache.invalidate_connectors(self.env.cr.dbname, self.ids)
+        self.env['api.connector.cache.entry'].sudo().search([('connector_id', 'in', self.ids)]).unlink()
+
+    def _prepare_request(self, event_record, values=None):
+        PARAMS = {}
+        HEADERS = {}
+        if values is None and event_record is not None:
+            values = self._get_dynamic_values(event_record).get(event_record.id)
+        headers_dict = self._get_request_headers(event_record, values)
+        parameters_dict = self._get_request_parameters(event_record, values)
+        url_to_call = self._add_to_url(event_record, values)
         HEADERS.update(headers_dict)
         PARAMS.update(parameters_dict)
-        payload = ""
+        payload = self._render_body(event_record)
+        if payload and self.body_format == 'json':
+            HEADERS.setdefault('Content-Type', 'application/json')
         if self.authorization == 'Bearer':
             HEADERS['Authorization'] = 'Bearer ' + self.bearer_token
         elif self.authorization == 'Basic Auth':
             HEADERS['Authorization'] = 'Basic ' + base64.b64encode(
                 bytes(self.basic_auth_user_name + ':' + self.basic_auth_password, 'utf-8')).decode('utf-8')
         elif self.authorization == 'O Auth 2':
-            HEADERS['Authorization'] = 'Bearer ' + self.bearer_token
+            HEADERS['Authorization'] = 'Bearer ' + self._get_oauth_access_token()
+        request_kwargs = {'method': self.request_type, 'url': url_to_call, 'timeout': self._get_timeout()}
         if self.request_method == "REST":
-            r = self.request_func[self.request_type](url_to_call, params=PARAMS, headers=HEADERS, data=payload)
+            request_kwargs.update(params=PARAMS, headers=HEADERS, data=payload)
         else:
-            r = self.request_func[self.request_type](url_to_call, json={"query": self.request_body})
+            request_kwargs.update(json=self._get_graphql_payload(event_record, values))
+        return request_kwargs
+
+    def _get_graphql_payload(self, event_record, values=None):
+        payload = {"query": self.request_body}
+        variables = self._render_variables(event_record, values)
+        if variables is not None:
+            payload["variables"] = variables
+        return payload
+
+    def _parse_response(self, r):
+        response_object = self._parse_json(r)
+        with metrics_registry.timer(self.env.cr.dbname, self.id, 'flatten'):
+            return flatten_response(response_object, self.flatten_mode)
+
+    def _parse_json(self, r):
         if r.status_code == 200:
             try:
-                self.response = json.dumps(ApiConnector._flatten_dict(r.json()), indent=4)
+                with metrics_registry.timer(self.env.cr.dbname, self.id, 'json'):
+                    return r.json()
             except Exception as e:
                 raise UserError("Invalid Response to the given request. Please check the request. \nExpecting "
                                       "the response in JSON\n\nCurrent Response\n" + str(r.content))
         else:
             raise UserError("Invalid Request Response Code\n" + str(r.status_code))
 
-    def _get_request_headers(self, event_record):
+    def _process_event_record(self, event_record):
+        """ Run the connector for one event record: call the API and apply the response. """
+        if self.pagination_mode != 'none':
+            return self._fetch_all_pages(event_record)
+        if self.batch_mode != 'off':
+            return self.trigger_response_batch(self.send_request_bulk(event_record))
+        self.trigger_response(self._send_request(event_record))
+
+    def action_fetch_all_pages(self):
+        self._fetch_all_pages()
+
+    def _fetch_all_pages(self, event_record=None):
+        """ Stream every page and apply its items in batches; returns the number of items processed. """
+        self.ensure_one()
+        batch_size = self.pagination_batch_size or 100
+        batch = []
+        count = 0
+        for item in self._iter_page_items(event_record):
+            batch.append(ExecutionContext(event_record, flatten_response(item, self.flatten_mode)))
+            count += 1
+            if len(batch) >= batch_size:
+                self.trigger_response_batch(batch)
+                batch = []
+        if batch:
+            self.trigger_response_batch(batch)
+        self._flush_telemetry()
+        return count
+
+    def _iter_page_items(self, event_record=None):
+        max_items = self.pagination_max_items
+        count = 0
+        for page in self._iter_pages(event_record):
+            for item in self._get_page_items(page):
+                yield item
+                count += 1
+                if max_items and count >= max_items:
+                    return
+
+    def _iter_pages(self, event_record=None, request_kwargs=None):
+        """ Lazily yield the parsed pages, downloading the next page while the current one is processed. """
+        if request_kwargs is None:
+            request_kwargs = self._prepare_request(event_record)
+        request_kwargs = self._paginate_request(request_kwargs, None)
+        send = self._get_http_sender(request_kwargs['url'])
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='api_connector_pager') as executor:
+            future = executor.submit(send, request_kwargs)
+            page_count = 0
+            while future is not None:
+                r = future.result()
+                page = self._parse_json(r)
+                page_count += 1
+                future = None
+                if not self.pagination_max_pages or page_count < self.pagination_max_pages:
+                    request_kwargs = self._next_page_request(request_kwargs, r, page)
+                    if request_kwargs:
+                        future = executor.submit(send, request_kwargs)
+                yield page
+
+    def _paginate_request(self, request_kwargs, position):
+        """ Return a copy of ``request_kwargs`` asking for the page at ``position`` (None for the first page). """
+        request_kwargs = dict(request_kwargs)
+        mode = self.pagination_mode
+        if self.request_method == "GRAPHQL":
+            variables = dict(request_kwargs['json'].get('variables') or {})
+            if self.pagination_size_param:
+                variables[self.pagination_size_param] = self.pagination_page_size
+            if position is not None:
+                variables[self.pagination_param or 'after'] = position
+            request_kwargs['json'] = dict(request_kwargs['json'], variables=variables)
+            return request_kwargs
+        params = dict(request_kwargs.get('params') or {})
+        if mode == 'link' and position is not None:
+            # the next link already carries every query parameter
+            request_kwargs['url'] = position
+            params = {}
+        else:
+            if self.pagination_size_param:
+                params[self.pagination_size_param] = self.pagination_page_size
+            if mode in ('page', 'offset'):
+                first = self.pagination_start if mode == 'page' else self.pagination_start_offset
+                params[self.pagination_param] = first if position is None else position
+            elif position is not None:
+                params[self.pagination_param] = position
+        request_kwargs['params'] = params
+        return request_kwargs
+
+    def _next_page_request(self, request_kwargs, r, page):
+        mode = self.pagination_mode
+        if mode == 'none':
+            return None
+        if mode in ('page', 'offset'):
+            items = self._get_page_items(page)
+            # a short page only means the end when the page size was asked for, not when the server chose it
+            if not items or (self.pagination_size_param and self.pagination_page_size
+                             and len(items) < self.pagination_page_size):
+                return None
+            current = request_kwargs['params'][self.pagination_param]
+            step = 1 if mode == 'page' else len(items)
+            return self._paginate_request(request_kwargs, int(current) + step)
+        if mode == 'link':
+            next_url = r.links.get('next', {}).get('url')
+            return next_url and self._paginate_request(request_kwargs, next_url)
+        cursor_value = self._extract_page_value(page, self.pagination_cursor_path)
+        if mode == 'graphql':
+            if not (isinstance(cursor_value, dict) and cursor_value.get('hasNextPage')):
+                return None
+            cursor_value = cursor_value.get('endCursor')
+        return cursor_value and self._paginate_request(request_kwargs, cursor_value)
+
+    def _get_page_items(self, page):
+        items = self._extract_page_value(page, self.pagination_items_path) if self.pagination_items_path else page
+        if items is None:
+            return []
+        return items if isinstance(items, list) else [items]
+
+    @staticmethod
+    def _extract_page_value(page, path):
+        return extract_paths(page, [(path, compile_path(path))]).get(path)
+
+    @api.model
+    def _cron_sync_connectors(self):
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        now = fields.Datetime.now()
+        for connector in self.search([('sync_enabled', '=', True)]):
+            if connector.sync_last_run and connector.sync_last_run + timedelta(minutes=connector.sync_interval) > now:
+                continue
+            try:
+                with self.env.cr.savepoint():
+                    connector._run_sync()
+            except Exception:
+                _logger.exception("Scheduled sync of API connector %s failed", connector.name)
+            if auto_commit:
+                self.env.cr.commit()
+
+    def action_run_sync(self):
+        for connector in self:
+            connector._run_sync()
+
+    def _run_sync(self):
+        """ Pull the changes since the stored high-water mark, upsert them and advance the mark. """
+        self.ensure_one()
+        # the mark is advanced in the same transaction as the upserts; one sync per connector at a time. An
+        # advisory lock leaves the connector row free for the foreign keys of jobs, call logs and tokens.
+        self.env.cr.execute("SELECT pg_try_advisory_xact_lock(%s, %s)", [SYNC_LOCK_NAMESPACE, self.id])
+        if not self.env.cr.fetchone()[0]:
+            raise UserError("A synchronisation of connector %s is already running" % self.name)
+        watermark = self.sync_watermark or False
+        batch_size = self.pagination_batch_size or 100
+        max_items = self.pagination_max_items
+        batch = []
+        count = 0
+        for page in self._iter_pages(request_kwargs=self._prepare_sync_request()):
+            page_complete = True
+            for item in self._get_page_items(page):
+                if max_items and count >= max_items:
+                    page_complete = False
+                    break
+                if self.sync_watermark_type == 'timestamp':
+                    item_mark = self._extract_page_value(item, self.sync_watermark_path)
+                    if item_mark is not None and (
+                            not watermark or parse_watermark(item_mark) > parse_watermark(watermark)):
+                        watermark = str(item_mark)
+                batch.append(item)
+                count += 1
+                if len(batch) >= batch_size:
+                    self._upsert_items(batch)
+                    batch = []
+            if not page_complete:
+                # the cursor of this page would skip its unprocessed items: the next run starts over from it
+                break
+            if self.sync_watermark_type == 'cursor':
+                watermark = self._extract_page_value(page, self.sync_watermark_path) or watermark
+            if max_items and count >= max_items:
+                break
+        if batch:
+            self._upsert_items(batch)
+        self.write({'sync_watermark': watermark, 'sync_last_run': fields.Datetime.now()})
+        self._flush_telemetry()
+        return count
+
+    def _prepare_sync_request(self):
+        request_kwargs = self._prepare_request(None)
+        if self.sync_watermark and self.sync_watermark_param:
+            if self.request_method == "GRAPHQL":
+                variables = dict(request_kwargs['json'].get('variables') or {})
+                variables[self.sync_watermark_param] = self.sync_watermark
+                request_kwargs['json'] = dict(request_kwargs['json'], variables=variables)
+            else:
+                request_kwargs['params'] = dict(request_kwargs['params'],
+                                                **{self.sync_watermark_param: self.sync_watermark})
+        return request_kwargs
+
+    def _upsert_items(self, items):
+        """ Create or update target records matched on the external id, with one search for the whole batch. """
+        Model = self.env[self.target_model_name]
+        key_field = Model._fields[self.sync_external_id_field_id.name]
+        values_by_external_id = {}
+        for item in items:
+            external_id = key_field.convert_to_cache(
+                self._extract_page_value(item, self.sync_external_id_path), Model)
+            if not external_id:
+                continue
+            values = self._fetch_key_value_pair_response(flatten_response(item, self.flatten_mode))
+            values[key_field.name] = external_id
+            values_by_external_id[external_id] = values
+        existing = {
+            record[key_field.name]: record.id
+            for record in Model.with_context(active_test=False).search(
+                [(key_field.name, 'in', list(values_by_external_id))])
+        }
+        self._write_response_values([
+            (existing[external_id], values)
+            for external_id, values in values_by_external_id.items() if external_id in existing
+        ])
+        new_values = [values for external_id, values in values_by_external_id.items() if external_id not in existing]
+        if new_values:
+            Model.create(new_values)
+
+    def _get_session(self, url=None, max_retries=None):
+        return session_registry.get_session(url or self.url, pool_size=self.pool_size or 10,
+                                            max_retries=self.max_retries if max_retries is None else max_retries,
+                                            keep_alive=self.keep_alive)
+
+    def _get_timeout(self):
+        return (self.connect_timeout or None, self.read_timeout or None)
+
+    @api.model
+    def get_pool_stats(self):
+        return session_registry.stats()
+
+    @tools.ormcache('self.id')
+    def _get_request_template(self):
+        """ Compile the connector configuration once; invalidated whenever a connector or one of its lines changes. """
+        connector = self.sudo()
+        # every event record field read by the lines, each line keeping the position of its value
+        dynamic_fields = {}
+
+        def compile_lines(model_name):
+            return tuple(
+                (line.key, line.static_value,
+                 dynamic_fields.setdefault(line.dynamic_value.name, len(dynamic_fields))
+                 if line.take_from_event_record and line.dynamic_value else None)
+                for line in self.env[model_name].sudo().search([("api_connector_id", "=", connector.id)])
+            )
+
+        mappings = tuple(
+            (line.key.name, line.static_value, line.dynamic_value if line.take_from else None)
+            for line in self.env["response.key.value"].sudo().search([("response_key_id", "=", connector.id)])
+        )
+        response_paths = ()
+        if connector.flatten_mode == 'none':
+            # the response keeps its structure: every mapped key is a path compiled once here
+            try:
+                response_paths = tuple(
+                    (response_key, compile_path(response_key))
+                    for response_key in {response_key for _name, _value, response_key in mappings if response_key}
+                )
+            except ValueError as e:
+                raise UserError(str(e))
+        if connector.request_method == "GRAPHQL":
+            # the query is sent as written, values travel in the variables
+            body, variables = None, connector.request_variables and compile_body(connector.request_variables)
+        else:
+            body, variables = connector.request_body and compile_body(connector.request_body), None
+        return RequestTemplate(
+            headers=compile_lines("api.header"),
+            parameters=compile_lines("api.parameter"),
+            url_segments=compile_lines("add.to.url"),
+            dynamic_fields=tuple(dynamic_fields),
+            mappings=mappings,
+            response_paths=response_paths,
+            body=body or None,
+            variables=variables or None,
+        )
+
+    def _get_dynamic_values(self, event_records):
+        """ Read the fields used by the lines for all event records in one go.
+
+        Returns, per record id, the tuple of values in the order of the template's dynamic fields; relational
+        fields give ids.
+        """
+        field_names = self._get_request_template().dynamic_fields
+        if not field_names or not event_records:
+            return {}
+        rows = event_records.read(list(field_names), load=None)
+        return {row['id']: tuple(row[name] for name in field_names) for row in rows}
+
+    def _resolve_lines(self, lines, event_record, values):
+        if values is None and event_record is not None and any(position is not None for _k, _v, position in lines):
+            values = self._get_dynamic_values(event_record).get(event_record.id)
+        return [
+            (key, static_value if position is None or values is None else values[position])
+            for key, static_value, position in lines
+        ]
+
+    def _prefetch_template_fields(self, event_records):
+        """ Load every field the body templates read for all event records at once, instead of per record. """
+        template = self._get_request_template()
+        paths = {path for compiled in (template.body, template.variables) if compiled for path in compiled.paths}
+        try:
+            for path in paths:
+                event_records.mapped('.'.join(path))
+        except KeyError as e:
+            raise UserError("Invalid placeholder in the request body of %s: %s" % (self.name, e.args[0]))
+
+    def _render_template(self, compiled, event_record, encode):
+        try:
+            return compiled.render(event_record, encode)
+        except KeyError as e:
+            raise UserError("Invalid placeholder in the request body of %s: %s" % (self.name, e.args[0]))
+
+    def _render_body(self, event_record):
+        compiled = self._get_request_template().body
+        if compiled is None:
+            return ""
+        return self._render_template(compiled, event_record,
+                                     encode_json if self.body_format == 'json' else encode_text)
+
+    def _render_variables(self, event_record, values=None):
+        """ Return the GraphQL variables: the request parameters completed by the rendered variables template.
+
+        Without a variables template the query is sent alone, as before templates existed, and None is returned.
+        """
+        compiled = self._get_request_template().variables
+        if compiled is None:
+            return None
+        variables = self._get_request_parameters(event_record, values)
+        rendered = self._render_template(compiled, event_record, encode_json)
+        try:
+            variables.update(json.loads(rendered))
+        except (ValueError, TypeError) as e:
+            raise UserError("The GraphQL variables of %s are not a JSON object\n%s" % (self.name, e))
+        return variables
+
+    def _get_request_headers(self, event_record, values=None):
         headers_dict = {}
         for request in self:
-            request_headers = self.env["api.header"].search([("api_connector_id", "=", request.id)])
-            for header in request_headers:
-                if event_record is not None and header.take_from_event_record:
-                    headers_dict[header.key] = getattr(event_record, header.dynamic_value.name)
-                else:
-                    headers_dict[header.key] = header.static_value
+            headers_dict.update(request._resolve_lines(request._get_request_template().headers, event_record, values))
         return headers_dict
 
-    def _get_request_parameters(self, event_record):
+    def _get_request_parameters(self, event_record, values=None):
         parameters_dict = {}
         for request in self:
-            request_parameters = self.env["api.parameter"].search([("api_connector_id", "=", request.id)])
-            for parameter in request_parameters:
-                if event_record is not None and parameter.take_from_event_record:
-                    parameters_dict[parameter.key] = getattr(event_record, parameter.dynamic_value.name)
-                else:
-                    parameters_dict[parameter.key] = parameter.static_value
+            parameters_dict.update(
+                request._resolve_lines(request._get_request_template().parameters, event_record, values))
         return parameters_dict
 
-    def _add_to_url(self, event_record):
+    def _add_to_url(self, event_record, values=None):
         url_to_call = self.url
         for request in self:
-            add_to_urls = self.env["add.to.url"].search([("api_connector_id", "=", request.id)])
-            for url in add_to_urls:
-                if event_record is not None and url.take_from_event_record:
-                    url_to_call = f'{url_to_call}{"/"}{getattr(event_record, url.dynamic_value.name)}'
-                else:
-                    url_to_call = f'{url_to_call}{"/"}{url.static_value}'
+            for _key, value in request._resolve_lines(request._get_request_template().url_segments, event_record,
+                                                      values):
+                url_to_call = f'{url_to_call}{"/"}{value}'
         return url_to_call
 
     DEFAULT_PYTHON_CODE = """# Available variables:
@@ -163,19 +983,24 @@ class ApiConnector(models.Model):
                                                                                                              'Mapping',
                                    copy=True)
 
-    def _fetch_key_value_pair_response(self):
+    def _fetch_key_value_pair_response(self, response_object=None):
         actual_values = {}
-        response_object = json.loads(self.response)
+        if response_object is None:
+            response_object = json.loads(self.response)
         for request in self:
-            response_keys_values = self.env["response.key.value"].search([("response_key_id", "=", request.id)])
-            for response_key_value in response_keys_values:
-                if not response_key_value.take_from:
-                    actual_values[response_key_value.key.name] = response_key_value.static_value
+            template = request._get_request_template()
+            if template.response_paths:
+                response_values = extract_paths(response_object, template.response_paths)
+            else:
+                response_values = response_object
+            for field_name, static_value, response_key in template.mappings:
+                if response_key is None:
+                    actual_values[field_name] = static_value
                 else:
                     try:
-                        actual_values[response_key_value.key.name] = response_object[response_key_value.dynamic_value]
+                        actual_values[field_name] = response_values[response_key]
                     except KeyError:
-                        raise UserError("Key not found in Response Object " + response_key_value.dynamic_value)
+                        raise UserError("Key not found in Response Object " + response_key)
         return actual_values
 
     def open_oauth_user_authentication_url(self):
@@ -197,22 +1022,190 @@ class ApiConnector(models.Model):
         authorization_url = self.oauth_authorization_url + '?' + urlencode(oauth_params)
         return authorization_url
 
+    def _get_oauth_access_token(self):
+        """ Return a valid access token, refreshing it shortly before expiry with one refresh at a time. """
+        self.ensure_one()
+        key, generation = self._get_token_cache_key(), self._get_token_generation()
+        token = token_cache.get(key, generation)
+        if token is not None:
+            return token.access_token
+        with token_cache.refresh_lock(key):
+            token = token_cache.get(key, generation)
+            if token is None:
+                token = self._refresh_oauth_token()
+        return token.access_token
+
+    def _refresh_oauth_token(self):
+        with self.pool.cursor() as cr:
+            # session-level lock: only one worker refreshes, the others wait and then reuse its token
+            cr.execute("SELECT pg_advisory_lock(%s, %s)", [ADVISORY_LOCK_NAMESPACE, self.id])
+            try:
+                # start a new snapshot so a token committed by another worker meanwhile is visible
+                cr.commit()
+                connector = self.with_env(self.env(cr=cr)).sudo()
+                token = connector._get_stored_oauth_token()
+                if token is None:
+                    token = connector._store_oauth_token(connector._request_oauth_token())
+                    cr.commit()
+            finally:
+                cr.execute("SELECT pg_advisory_unlock(%s, %s)", [ADVISORY_LOCK_NAMESPACE, self.id])
+        token_cache.put(self._get_token_cache_key(), token, self._get_token_generation())
+        return token
+
+    def _get_token_cache_key(self):
+        return self.env.cr.dbname, self.id
+
+    @tools.ormcache('self.id')
+    def _get_token_generation(self):
+        # a new object whenever the registry caches are cleared, here or in another worker through signalling
+        return object()
+
+    def _get_oauth_token_record(self):
+        return self.env['api.connector.oauth.token'].sudo().search([('connector_id', '=', self.id)], limit=1)
+
+    def _get_stored_oauth_token(self):
+        token_record = self._get_oauth_token_record()
+        if not token_record:
+            # token pasted by hand or obtained before tokens were tracked: no known expiry
+            return OAuthToken(self.bearer_token, float('inf')) if self.bearer_token else None
+        expires_at = token_record.expires_at.timestamp() if token_record.expires_at else float('inf')
+        if expires_at - REFRESH_MARGIN <= time.time():
+            return None
+        return OAuthToken(token_record.access_token, expires_at)
+
+    def _request_oauth_token(self):
+        data = {'client_id': self.oauth_client_id, 'client_secret': self.oauth_client_secret}
+        refresh_token = self._get_oauth_token_record().refresh_token
+        if refresh_token:
+            data.update(grant_type='refresh_token', refresh_token=refresh_token)
+        elif self.oauth_grant_type == 'client_credentials':
+            data.update(grant_type='client_credentials')
+            if self.oauth_scope:
+                data['scope'] = self.oauth_scope
+        else:
+            raise UserError("The OAuth 2 token of connector %s expired. Please generate a new token." % self.name)
+        r = self._get_session(self.oauth_access_token_url).post(
+            self.oauth_access_token_url, data=data, headers={'Accept': 'application/json'},
+            timeout=self._get_timeout())
+        if r.status_code != 200:
+            raise UserError("Unable to refresh the OAuth 2 token\n" + str(r.status_code))
+        return r.json()
+
+    def _store_oauth_token(self, token_response):
+        """ Persist an OAuth token endpoint response and return the resulting token. """
+        expires_in = token_response.get('expires_in')
+        expiry = fields.Datetime.now() + timedelta(seconds=int(expires_in)) if expires_in else False
+        vals = {'access_token': token_response['access_token'], 'expires_at': expiry}
+        if token_response.get('refresh_token'):
+            vals['refresh_token'] = token_response['refresh_token']
+        token_record = self._get_oauth_token_record()
+        if token_record:
+            token_record.write(vals)
+        else:
+            self.env['api.connector.oauth.token'].sudo().create(dict(vals, connector_id=self.id))
+        token = OAuthToken(vals['access_token'], expiry.timestamp() if expiry else float('inf'))
+        token_cache.put(self._get_token_cache_key(), token, self._get_token_generation())
+        return token
+
+    def _compute_oauth_token_expiry(self):
+        tokens = self.env['api.connector.oauth.token'].sudo().search([('connector_id', 'in', self.ids)])
+        expiry_by_connector = {token.connector_id.id: token.expires_at for token in tokens}
+        for connector in self:
+            connector.oauth_token_expiry = expiry_by_connector.get(connector.id, False)
+
     @api.depends('response')
-    def trigger_response(self):
-        converted_key_value = self._fetch_key_value_pair_response()
-        if self.state == 'object_create':
-            self.env[self.target_model_name].create(
-                converted_key_value
-            )
-        elif self.state == 'object_write':
-            set_string = ""
-            model_name = str(self.target_model_name)
-            model_name = model_name.replace(".", "_")
-            for key in converted_key_value:
-                set_string = f"{set_string}{key} = '{converted_key_value[key]}', "
-            query_string = 'UPDATE ' + model_name + ' SET ' + set_string[:-2] + ' WHERE id = ' + str(
-                self.response_event_record.id)
-            self.env.cr.execute(query_string)
+    def trigger_response(self, context=None):
+        if context is None:
+            # manual call after send_request: fall back on what it stored on the connector
+            try:
+                response_object = json.loads(self.response or '')
+            except ValueError:
+                raise UserError("The response stored on %s cannot be applied again, send the request with the "
+                                "response stored in full first" % self.name)
+            context = ExecutionContext(self.response_event_record or None, response_object)
+        self.trigger_response_batch([context])
+
+    def trigger_response_batch(self, contexts):
+        """ Map and apply the execution contexts of send_request_batch in a single pass. """
+        with metrics_registry.timer(self.env.cr.dbname, self.id, 'mapping'):
+            for context in contexts:
+                context.values = self._fetch_key_value_pair_response(context.response_object)
+        with metrics_registry.timer(self.env.cr.dbname, self.id, 'apply'):
+            if self.state == 'object_create':
+                self.env[self.target_model_name].create([context.values for context in contexts])
+            elif self.state == 'object_write':
+                self._write_response_values([
+                    (context.event_record.id, context.values) for context in contexts if context.event_record
+                ])
+
+    def _write_response_values(self, values_list):
+        """ Write many (record id, mapped values) pairs with one statement per batch instead of one per record.
+
+        The UPDATE bypasses ``write()``: overrides, tracking and automations of the target model do not run.
+        It is therefore only used for plain, untracked columns that no computed field, constraint or automation
+        watches, any other field goes through the ORM.
+        """
+        values_list = [(record_id, values) for record_id, values in values_list if values]
+        if not values_list:
+            return
+        Model = self.env[self.target_model_name]
+        groups = {}
+        for record_id, values in values_list:
+            group_key = json.dumps(values, sort_keys=True, default=str)
+            groups.setdefault(group_key, (values, []))[1].append(record_id)
+        fnames = sorted(values_list[0][1])
+        model_fields = [Model._fields[fname] for fname in fnames]
+        same_keys = all(sorted(values) == fnames for _record_id, values in values_list)
+        if len(groups) == 1 or not (same_keys and self._can_write_with_sql(Model, model_fields)):
+            # identical values (or non-column fields): one ORM write per distinct set of values
+            for values, record_ids in groups.values():
+                Model.browse(record_ids).write(values)
+            return
+        records = Model.browse([record_id for record_id, _values in values_list])
+        records.flush_recordset(fnames)
+        assignments = [
+            sql.SQL("{column} = v.{column}::{column_type}").format(
+                column=sql.Identifier(field.name), column_type=sql.SQL(field.column_type[1]))
+            for field in model_fields
+        ]
+        written = list(fnames)
+        if Model._log_access:
+            assignments.append(sql.SQL("write_uid = {uid}, write_date = (now() at time zone 'UTC')").format(
+                uid=sql.Literal(self.env.uid)))
+            written += ['write_uid', 'write_date']
+        query_head = sql.SQL("UPDATE {table} AS t SET {assignments} FROM (VALUES ").format(
+            table=sql.Identifier(Model._table), assignments=sql.SQL(', ').join(assignments))
+        query_tail = sql.SQL(") AS v({columns}) WHERE t.id = v.id").format(
+            columns=sql.SQL(', ').join(map(sql.Identifier, ['id'] + fnames)))
+        row_placeholder = sql.SQL("({})").format(sql.SQL(', ').join([sql.Placeholder()] * (len(fnames) + 1)))
+        for chunk in tools.split_every(1000, values_list):
+            params = []
+            for record_id, values in chunk:
+                params.append(record_id)
+                params.extend(field.convert_to_column(values[field.name], Model) for field in model_fields)
+            query = sql.Composed([query_head, sql.SQL(', ').join([row_placeholder] * len(chunk)), query_tail])
+            self.env.cr.execute(query, params)
+        records.invalidate_recordset(written)
+
+    def _can_write_with_sql(self, Model, model_fields):
+        """ Whether the fields can be updated with raw SQL, nothing reacting to their change. """
+        for field in model_fields:
+            if not (field.store and field.column_type) or field.translate or field.compute or field.inverse:
+                return False
+            if getattr(field, 'tracking', None):
+                # mail.thread only records tracked changes made through write()
+                return False
+            if Model.pool.field_triggers.get(field):
+                return False
+        fnames = {field.name for field in model_fields}
+        for method in Model._constraint_methods:
+            names = method._constrains(Model) if callable(method._constrains) else method._constrains
+            if fnames.intersection(names):
+                return False
+        automation_domain = [('model_name', '=', Model._name), ('trigger', 'in', ('on_write', 'on_create_or_write'))]
+        if self.env['base.automation'].sudo().search_count(automation_domain, limit=1):
+            return False
+        return self.env['base.automation.api.trigger']._get_watched_fields(Model._name, 'write') is None
 
     @api.model_create_multi
     def create(self, vals_list):
@@ -224,48 +1217,35 @@ class ApiConnector(models.Model):
 
     def write(self, vals):
         res = super().write(vals)
+        if TEMPLATE_FIELDS.intersection(vals):
+            self.clear_caches()
+        if OAUTH_FIELDS.intersection(vals):
+            # a token obtained with the previous credentials must not be reused by any worker
+            self.env['api.connector.oauth.token'].sudo().search([('connector_id', 'in', self.ids)]).unlink()
+            for connector in self:
+                token_cache.discard(connector._get_token_cache_key())
+            # the other workers drop their cached tokens when they see the registry caches cleared
+            self.clear_caches()
         self.api_trigger_id.action_server_id.is_connector_action = True
         self.api_trigger_id.action_server_id.action_api_connector_id = self
         return res
 
+    def unlink(self):
+        res = super().unlink()
+        self.clear_caches()
+        return res
+
     @staticmethod
     def _flatten_dict(d):
-        ans = {}
-        for k, v in d.items():
-            if type(v) is not list:
-                ans[k] = v
-            else:
-                for d in v:
-                    ans |= ApiConnector._flatten_dict(d)
-        return ans
-
-    def get_export_url(self):
-        url = self._add_to_url(None)
-        params = self._get_request_parameters(None)
-        if not params:
-            return url
-        url += '/?'
-        for key, value in params.items():
-            url += f"{key}={value}&"
-        return url[:len(url) - 1]
-
-    def get_export_header(self):
-        header = []
-        for key, value in self._get_request_headers(None).items():
-            header.append({
-                "key": key,
-                "value": value,
-                "type": "text"
-            }, )
-        return header
-
-    def get_export_auth(self):
+        return flatten_response(d)
+
+    def get_export_auth(self, version='2.0'):
         auth = {}
         postman_auth = {'No Auth': "noauth", 'Bearer': 'bearer', 'Basic Auth': 'basic', 'O Auth 2': 'oauth2'}
         auth["type"] = postman_auth[self.authorization]
         match auth["type"]:
             case "oauth2":
-                auth["oauth2"] = {
+                values = {
                     "clientSecret": self.oauth_client_secret,
                     "clientId": self.oauth_client_id,
                     "accessTokenUrl": self.oauth_access_token_url,
@@ -273,13 +1253,62 @@ class ApiConnector(models.Model):
                     "addTokenTo": "header"
                 }
             case "bearer":
-                auth["bearer"] = {"token": self.bearer_token}
+                values = {"token": self.bearer_token}
             case "basic":
-                auth["basic"] = {"username": self.basic_auth_user_name, "password": self.basic_auth_password}
+                values = {"username": self.basic_auth_user_name, "password": self.basic_auth_password}
             case _:
-                pass
+                return auth
+        if version == '2.1':
+            # collection v2.1 lists auth values as key/value pairs
+            values = [{"key": key, "value": value, "type": "string"} for key, value in values.items()]
+        auth[auth["type"]] = values
         return auth
 
+    @api.constrains('batch_mode', 'request_method')
+    def _check_batch_mode(self):
+        for record in self:
+            if record.batch_mode == 'json_array' and record.request_method == "GRAPHQL":
+                raise UserError("GraphQL connectors send bulk requests as a GraphQL batch, not as a JSON array")
+            if record.batch_mode == 'graphql_batch' and record.request_method != "GRAPHQL":
+                raise UserError("A GraphQL batch can only be sent by a GraphQL connector")
+
+    @api.constrains('pagination_mode', 'pagination_param', 'pagination_cursor_path', 'request_method')
+    def _check_pagination(self):
+        for record in self:
+            if record.request_method == "GRAPHQL" and record.pagination_mode in ('page', 'offset', 'link'):
+                raise UserError("GraphQL connectors can only be paginated with a cursor or the GraphQL pageInfo")
+            if record.pagination_mode in ('page', 'offset', 'cursor') and not record.pagination_param:
+                raise UserError("Please set the page parameter used for pagination")
+            if record.pagination_mode in ('cursor', 'graphql') and not record.pagination_cursor_path:
+                raise UserError("Please set the cursor path used for pagination")
+            for path in (record.pagination_items_path, record.pagination_cursor_path):
+                try:
+                    compile_path(path)
+                except ValueError as e:
+                    raise UserError(str(e))
+
+    @api.constrains('sync_enabled', 'target_model_id', 'sync_external_id_field_id', 'sync_external_id_path')
+    def _check_sync(self):
+        for record in self:
+            if record.sync_enabled and not (record.target_model_id and record.sync_external_id_field_id
+                                            and record.sync_external_id_path):
+                raise UserError("A scheduled sync needs a target model, an external ID field and an external ID path")
+
+    @api.constrains('transport', 'http2')
+    def _check_transport(self):
+        if any(record.transport == 'async' for record in self) and not async_transport.available:
+            raise UserError("The asynchronous transport needs the httpx Python package")
+        if any(record.transport == 'async' and record.http2 for record in self) and \
+                not async_transport.http2_available:
+            raise UserError("HTTP/2 needs the h2 Python package")
+
+    @api.constrains('accept_encoding', 'transport')
+    def _check_accept_encoding(self):
+        for record in self:
+            if not encoding_available(record.accept_encoding, record.transport):
+                raise UserError("The %s response encoding needs its Python package (brotli, zstandard) and an HTTP "
+                                "client able to decode it (urllib3 2, httpx 0.27.1)" % record.accept_encoding)
+
     @api.constrains('url')
     def _check_url(self):
         for record in self:
@@ -0,0 +1,48 @@
+import json
+
+from odoo import api, fields, models
+
+from .response_cache import CacheEntry
+
+
+class ApiConnectorCacheEntry(models.Model):
+    _name = 'api.connector.cache.entry'
+    _description = 'Shared API Response Cache Entry'
+
+    key = fields.Char(required=True, index=True)
+    connector_id = fields.Many2one('api.connector', required=True, ondelete='cascade', index=True)
+    etag = fields.Char('ETag')
+    last_modified = fields.Char('Last Modified')
+    expires_at = fields.Float('Expires At (epoch)')
+    payload = fields.Text()
+
+    _sql_constraints = [
+        ('key_uniq', 'unique(key)', "A cached response already exists for this request."),
+    ]
+
+    @api.model
+    def _get_entry(self, key):
+        self.env.cr.execute("""
+            SELECT expires_at, etag, last_modified, payload FROM api_connector_cache_entry WHERE key = %s
+        """, [key])
+        row = self.env.cr.fetchone()
+        if not row:
+            return None
+        expires_at, etag, last_modified, payload = row
+        return CacheEntry(expires_at, etag, last_modified, json.loads(payload))
+
+    @api.model
+    def _put_entry(self, connector_id, key, entry):
+        self.env.cr.execute("""
+            INSERT INTO api_connector_cache_entry (key, connector_id, etag, last_modified, expires_at, payload,
+                                                   create_uid, write_uid, create_date, write_date)
+                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW() AT TIME ZONE 'UTC', NOW() AT TIME ZONE 'UTC')
+            ON CONFLICT (key) DO UPDATE
+                    SET etag = EXCLUDED.etag, last_modified = EXCLUDED.last_modified,
+                        expires_at = EXCLUDED.expires_at, payload = EXCLUDED.payload, write_date = EXCLUDED.write_date
+        """, [key, connector_id, entry.etag, entry.last_modified, entry.expires_at, json.dumps(entry.payload),
+              self.env.uid, self.env.uid])
+
+    @api.autovacuum
+    def _gc_expired_entries(self):
+        self.env.cr.execute("DELETE FROM api_connector_cache_entry WHERE expires_at < EXTRACT(EPOCH FROM NOW())")
@@ -0,0 +1,95 @@
+import base64
+import logging
+import threading
+import zlib
+from datetime import timedelta
+
+from psycopg2.extras import execute_values
+
+from odoo import api, fields, models
+
+from .call_log import call_log_buffer
+
+_logger = logging.getLogger(__name__)
+
+# Rows removed per statement by the retention cron
+RETENTION_CHUNK = 10000
+
+
+class ApiConnectorCall(models.Model):
+    _name = 'api.connector.call'
+    _description = 'API Connector Call Log'
+    _order = 'id desc'
+    _log_access = False
+
+    # Append-only: rows are inserted in batches by _flush_worker_logs and never written afterwards
+    connector_id = fields.Many2one('api.connector', required=True, ondelete='cascade', index=True)
+    call_date = fields.Datetime(required=True, index=True)
+    success = fields.Boolean()
+    status_code = fields.Integer()
+    duration_ms = fields.Float('Duration (ms)')
+    request_size = fields.Integer('Request Size (bytes)')
+    response_size = fields.Integer('Response Size (bytes)')
+    url = fields.Char('URL')
+    error = fields.Char()
+    body = fields.Binary('Compressed Body', attachment=False)
+    body_text = fields.Text('Body', compute='_compute_body_text')
+
+    def _compute_body_text(self):
+        for call in self:
+            # the form reads with bin_size, which would give the size of the body instead of its content
+            body = call.with_context(bin_size=False).body
+            call.body_text = body and zlib.decompress(base64.b64decode(body)).decode('utf-8', 'replace')
+
+    def _flush_cursor(self):
+        return self.pool.cursor()
+
+    @api.model
+    def _flush_worker_logs(self, force=False):
+        """ Insert this worker's buffered call logs of the current database with one statement, in a cursor of
+        its own. Telemetry never fails the caller: a batch that cannot be written is logged and dropped.
+        """
+        dbname = self.env.cr.dbname
+        if not (force or call_log_buffer.flush_due(dbname)):
+            return
+        entries = call_log_buffer.drain(dbname)
+        if not entries:
+            return
+        try:
+            with self._flush_cursor() as cr:
+                # connectors not committed yet, or deleted since, cannot be referenced: their logs are dropped
+                execute_values(cr._obj, """
+                    INSERT INTO api_connector_call (connector_id, call_date, success, status_code, duration_ms,
+                                                    request_size, response_size, url, error, body)
+                         SELECT v.connector_id, v.call_date, v.success, v.status_code, v.duration_ms,
+                                v.request_size, v.response_size, v.url, v.error, v.body
+                           FROM (VALUES %s) AS v(connector_id, call_date, success, status_code, duration_ms,
+                                                 request_size, response_size, url, error, body)
+                           JOIN api_connector c ON c.id = v.connector_id
+                """, [(
+                    entry['connector_id'], entry['call_date'], entry['success'], entry['status_code'],
+                    entry['duration_ms'], entry['request_size'], entry['response_size'], entry['url'],
+                    entry['error'], entry['body'],
+                ) for entry in entries], template="""(
+                    %s::int, %s::timestamp, %s::bool, %s::int, %s::float8, %s::int, %s::int, %s::varchar,
+                    %s::varchar, %s::bytea
+                )""")
+        except Exception:
+            _logger.exception("Could not write %s connector call logs, dropping them", len(entries))
+
+    @api.model
+    def _cron_gc_calls(self):
+        self._flush_worker_logs(force=True)
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        days = int(self.env['ir.config_parameter'].sudo().get_param('api_connector.call_log_retention_days', 30))
+        limit_date = fields.Datetime.now() - timedelta(days=days)
+        while True:
+            self.env.cr.execute("""
+                DELETE FROM api_connector_call
+                 WHERE id IN (SELECT id FROM api_connector_call WHERE call_date < %s LIMIT %s)
+            """, [limit_date, RETENTION_CHUNK])
+            deleted = self.env.cr.rowcount
+            if auto_commit:
+                self.env.cr.commit()
+            if deleted < RETENTION_CHUNK:
+                break
@@ -1,6 +1,13 @@
-import requests
+import io
+import tempfile
+
+from werkzeug.wrappers import Response
+from werkzeug.wsgi import wrap_file
 
 from odoo import http
+from odoo.tools import consteq
+
+from .metrics import format_prometheus
 
 class APIConnector(http.Controller):
     @http.route('/oauthcallback', auth='public', website=False, sitemap=False)
@@ -17,10 +24,50 @@ class APIConnector(http.Controller):
                 'grant_type': 'authorization_code'
             }
             headers = {'Accept': 'application/json'}
-            response = requests.post(api_connector.oauth_access_token_url, data=data, headers=headers)
+            session = api_connector._get_session(api_connector.oauth_access_token_url)
+            response = session.post(api_connector.oauth_access_token_url, data=data, headers=headers,
+                                    timeout=api_connector._get_timeout())
             response_json = response.json()
-            access_token = response_json['access_token']
-            api_connector.bearer_token = access_token
+            api_connector._store_oauth_token(response_json)
+            # a newly granted token replaces the one other workers may have cached
+            api_connector.clear_caches()
             return "Your token has been generated. Please close this tab"
         except Exception as e:
             return "Error while generating the Oauth 2 token\n"+str(e)
+
+    @http.route('/api_connector/metrics', auth='public', website=False, sitemap=False)
+    def metrics(self, token=None, **kwargs):
+        env = http.request.env
+        expected = env['ir.config_parameter'].sudo().get_param('api_connector.metrics_token')
+        if not (expected and token and consteq(expected, token)):
+            return http.request.not_found()
+        Metric = env['api.connector.metric'].sudo()
+        Metric._flush_worker_metrics(force=True)
+        return http.request.make_response(
+            format_prometheus(Metric._get_prometheus_rows()),
+            headers=[('Content-Type', 'text/plain; version=0.0.4')],
+        )
+
+    @http.route('/api_connector/export_postman/<int:wizard_id>', auth='user', website=False, sitemap=False)
+    def export_postman(self, wizard_id, **kwargs):
+        wizard = http.request.env['export.postman.collection'].browse(wizard_id).exists()
+        if not wizard:
+            return http.request.not_found()
+        # the collection is written to disk while the cursor is open, then streamed back in chunks; a plain
+        # temporary file since SpooledTemporaryFile cannot be wrapped as text before Python 3.11
+        spool = tempfile.TemporaryFile()
+        text = io.TextIOWrapper(spool, encoding='utf-8')
+        wizard._write_collection(text, wizard.connector_ids.ids)
+        text.flush()
+        text.detach()
+        size = spool.tell()
+        spool.seek(0)
+        return Response(
+            wrap_file(http.request.httprequest.environ, spool),
+            headers=[
+                ('Content-Type', 'application/json'),
+                ('Content-Length', str(size)),
+                ('Content-Disposition', 'attachment; filename="odoo_postman_collection.json"'),
+            ],
+            direct_passthrough=True,
+        )
@@ -0,0 +1,119 @@
+import logging
+import threading
+from collections import defaultdict
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+
+class ApiConnectorJob(models.Model):
+    _name = 'api.connector.job'
+    _description = 'Deferred API Connector Call'
+    _order = 'priority desc, id'
+
+    connector_id = fields.Many2one('api.connector', string='API Connector', required=True, ondelete='cascade',
+                                   index=True)
+    model_name = fields.Char('Event Model', required=True)
+    record_id = fields.Integer('Event Record ID', required=True)
+    priority = fields.Integer(default=10, index=True)
+    state = fields.Selection([('pending', 'Pending'), ('done', 'Done'), ('dead', 'Dead Letter')],
+                             default='pending', required=True, index=True)
+    attempts = fields.Integer(default=0)
+    next_attempt = fields.Datetime(default=fields.Datetime.now, index=True)
+    error = fields.Text(readonly=True)
+
+    @api.model
+    def _enqueue(self, connector, model_name, record_ids):
+        jobs = self.create([{
+            'connector_id': connector.id,
+            'model_name': model_name,
+            'record_id': record_id,
+            'priority': connector.job_priority,
+        } for record_id in record_ids])
+        cron = self.env.ref('api_connector.ir_cron_process_api_connector_jobs', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+        return jobs
+
+    def _fetch_due_job_ids(self, limit):
+        # SKIP LOCKED lets several cron workers drain the queue side by side
+        self.env.cr.execute("""
+            SELECT id FROM api_connector_job
+             WHERE state = 'pending' AND (next_attempt IS NULL OR next_attempt <= NOW() AT TIME ZONE 'UTC')
+          ORDER BY priority DESC, id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+        """, [limit])
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _cron_process_jobs(self, batch_size=100, max_batches=10):
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        for _batch in range(max_batches):
+            jobs = self.browse(self._fetch_due_job_ids(batch_size))
+            if not jobs:
+                break
+            jobs._run()
+            if auto_commit:
+                self.env.cr.commit()
+            if len(jobs) < batch_size:
+                break
+
+    def _run(self):
+        jobs_by_target = defaultdict(lambda: self.browse())
+        for job in self:
+            jobs_by_target[job.connector_id, job.model_name] |= job
+        for (connector, model_name), jobs in jobs_by_target.items():
+            records = self.env[model_name].browse(list(dict.fromkeys(jobs.mapped('record_id')))).exists()
+            missing = jobs.filtered(lambda job: job.record_id not in records.ids)
+            missing.write({'state': 'dead', 'error': "Event record no longer exists"})
+            jobs -= missing
+            if connector.batch_mode != 'off' and connector.pagination_mode == 'none' and len(records) > 1:
+                jobs._run_bulk(connector, records)
+                continue
+            for job in jobs:
+                job._run_one(connector, records.browse(job.record_id))
+
+    def _run_one(self, connector, event_record):
+        try:
+            with self.env.cr.savepoint():
+                connector._process_event_record(event_record)
+            self.write({'state': 'done', 'attempts': self.attempts + 1, 'error': False})
+        except Exception as e:
+            _logger.warning("Deferred call %s of connector %s failed: %s", self.id, connector.name, e)
+            self._schedule_retry(str(e))
+
+    def _run_bulk(self, connector, event_records):
+        """ Send the event records of jobs sharing a bulk connector as bulk payloads instead of one call each. """
+        try:
+            with self.env.cr.savepoint():
+                connector.trigger_response_batch(connector.send_request_bulk(event_records))
+        except Exception as e:
+            _logger.warning("Deferred bulk call of %s jobs of connector %s failed: %s", len(self), connector.name, e)
+            for job in self:
+                job._schedule_retry(str(e))
+            return
+        for job in self:
+            job.write({'state': 'done', 'attempts': job.attempts + 1, 'error': False})
+
+    def _schedule_retry(self, error):
+        self.ensure_one()
+        attempts = self.attempts + 1
+        if attempts >= self.connector_id.job_max_attempts:
+            self.write({'state': 'dead', 'attempts': attempts, 'error': error})
+            return
+        delay = self.connector_id.job_backoff_seconds * 2 ** (attempts - 1)
+        self.write({
+            'attempts': attempts,
+            'error': error,
+            'next_attempt': fields.Datetime.now() + timedelta(seconds=delay),
+        })
+
+    def action_requeue(self):
+        self.write({'state': 'pending', 'attempts': 0, 'next_attempt': fields.Datetime.now(), 'error': False})
+
+    @api.autovacuum
+    def _gc_done_jobs(self):
+        self.search([('state', '=', 'done'), ('write_date', '<', fields.Datetime.now() - timedelta(days=7))]).unlink()
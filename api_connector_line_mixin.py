@@ -0,0 +1,22 @@
+from odoo import api, models
+
+
+class ApiConnectorLineMixin(models.AbstractModel):
+    _name = 'api.connector.line.mixin'
+    _description = 'API Connector Configuration Line'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.clear_caches()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.clear_caches()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.clear_caches()
+        return res
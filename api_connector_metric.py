@@ -0,0 +1,125 @@
+import json
+import logging
+
+from odoo import api, fields, models
+
+from .metrics import BUCKETS_MS, metrics_registry
+
+_logger = logging.getLogger(__name__)
+
+
+class ApiConnectorMetric(models.Model):
+    _name = 'api.connector.metric'
+    _description = 'API Connector Phase Timings'
+    _order = 'connector_id, phase'
+
+    # One cumulative row per connector and phase, fed by every worker
+    connector_id = fields.Many2one('api.connector', required=True, ondelete='cascade', index=True)
+    phase = fields.Char(required=True)
+    count = fields.Integer()
+    total_ms = fields.Float('Total (ms)')
+    bucket_counts = fields.Text()
+    average_ms = fields.Float('Average (ms)', compute='_compute_quantiles')
+    p50_ms = fields.Float('p50 (ms)', compute='_compute_quantiles')
+    p95_ms = fields.Float('p95 (ms)', compute='_compute_quantiles')
+    p99_ms = fields.Float('p99 (ms)', compute='_compute_quantiles')
+
+    _sql_constraints = [
+        ('connector_phase_uniq', 'unique(connector_id, phase)', "Timings are kept once per connector and phase."),
+    ]
+
+    @api.depends('count', 'total_ms', 'bucket_counts')
+    def _compute_quantiles(self):
+        for metric in self:
+            counts = json.loads(metric.bucket_counts or '[]')
+            metric.average_ms = metric.total_ms / metric.count if metric.count else 0.0
+            metric.p50_ms = self._quantile(counts, 0.5)
+            metric.p95_ms = self._quantile(counts, 0.95)
+            metric.p99_ms = self._quantile(counts, 0.99)
+
+    @staticmethod
+    def _quantile(counts, q):
+        """ Upper bound of the bucket holding the q-quantile (the last finite bound for the +Inf bucket). """
+        total = sum(counts)
+        cumulative = 0
+        for index, count in enumerate(counts):
+            cumulative += count
+            if total and cumulative >= q * total:
+                return BUCKETS_MS[min(index, len(BUCKETS_MS) - 1)]
+        return 0.0
+
+    def _flush_cursor(self):
+        return self.pool.cursor()
+
+    @api.model
+    def _flush_worker_metrics(self, force=False):
+        """ Add this worker's histograms of the current database to the shared rows, in a cursor of its own.
+
+        Telemetry never fails the caller: a failed flush is logged and its histograms are kept for the next one.
+        """
+        dbname = self.env.cr.dbname
+        if not (force or metrics_registry.flush_due(dbname)):
+            return
+        histograms = metrics_registry.drain(dbname)
+        if not histograms:
+            return
+        try:
+            with self._flush_cursor() as cr:
+                self._write_histograms(cr, histograms)
+        except Exception:
+            _logger.exception("Could not flush connector timings, keeping them for the next flush")
+            metrics_registry.requeue(dbname, histograms)
+
+    @api.model
+    def _write_histograms(self, cr, histograms):
+        # connectors not committed yet, or deleted since, cannot be referenced: their samples are dropped
+        cr.execute("SELECT id FROM api_connector WHERE id IN %s",
+                   [tuple({connector_id for connector_id, _phase in histograms})])
+        existing = {row[0] for row in cr.fetchall()}
+        for (connector_id, phase), histogram in histograms.items():
+            if connector_id not in existing:
+                continue
+            cr.execute("""
+                SELECT id, bucket_counts FROM api_connector_metric
+                 WHERE connector_id = %s AND phase = %s FOR UPDATE
+            """, [connector_id, phase])
+            row = cr.fetchone()
+            if row is None:
+                cr.execute("""
+                    INSERT INTO api_connector_metric (connector_id, phase, count, total_ms, bucket_counts,
+                                                      create_date, write_date)
+                         VALUES (%s, %s, %s, %s, %s, NOW() AT TIME ZONE 'UTC', NOW() AT TIME ZONE 'UTC')
+                    ON CONFLICT (connector_id, phase) DO NOTHING
+                """, [connector_id, phase, sum(histogram.counts), histogram.total_ms,
+                      json.dumps(histogram.counts)])
+                if cr.rowcount:
+                    continue
+                cr.execute("""
+                    SELECT id, bucket_counts FROM api_connector_metric
+                     WHERE connector_id = %s AND phase = %s FOR UPDATE
+                """, [connector_id, phase])
+                row = cr.fetchone()
+            counts = [a + b for a, b in zip(json.loads(row[1]), histogram.counts)]
+            cr.execute("""
+                UPDATE api_connector_metric
+                   SET count = count + %s, total_ms = total_ms + %s, bucket_counts = %s,
+                       write_date = NOW() AT TIME ZONE 'UTC'
+                 WHERE id = %s
+            """, [sum(histogram.counts), histogram.total_ms, json.dumps(counts), row[0]])
+
+    @api.model
+    def _cron_flush_metrics(self):
+        self._flush_worker_metrics(force=True)
+
+    @api.model
+    def _get_prometheus_rows(self):
+        self.env.cr.execute("""
+            SELECT c.name, m.phase, m.bucket_counts, m.total_ms
+              FROM api_connector_metric m
+              JOIN api_connector c ON c.id = m.connector_id
+          ORDER BY c.name, m.phase
+        """)
+        return [(name, phase, json.loads(counts), total_ms) for name, phase, counts, total_ms in self.env.cr.fetchall()]
+
+    def action_reset(self):
+        self.unlink()
@@ -0,0 +1,16 @@
+from odoo import fields, models
+
+
+class ApiConnectorOAuthToken(models.Model):
+    _name = 'api.connector.oauth.token'
+    _description = 'API Connector OAuth 2 Token'
+
+    # Kept apart from api.connector so refreshing a token never locks the connector row used by triggers
+    connector_id = fields.Many2one('api.connector', required=True, ondelete='cascade', index=True)
+    access_token = fields.Char(required=True)
+    refresh_token = fields.Char()
+    expires_at = fields.Datetime()
+
+    _sql_constraints = [
+        ('connector_uniq', 'unique(connector_id)', "A connector can only have one OAuth 2 token."),
+    ]
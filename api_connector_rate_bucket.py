@@ -0,0 +1,15 @@
+from odoo import fields, models
+
+
+class ApiConnectorRateBucket(models.Model):
+    _name = 'api.connector.rate.bucket'
+    _description = 'API Connector Rate Limit Bucket'
+
+    # Rows are maintained with raw SQL by rate_limiter.RateLimiter, from any worker or thread
+    key = fields.Char(required=True, index=True)
+    tokens = fields.Float()
+    updated_at = fields.Float('Updated At (epoch)')
+
+    _sql_constraints = [
+        ('key_uniq', 'unique(key)', "A rate limit bucket already exists for this key."),
+    ]
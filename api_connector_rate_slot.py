@@ -0,0 +1,15 @@
+from odoo import fields, models
+
+
+class ApiConnectorRateSlot(models.Model):
+    _name = 'api.connector.rate.slot'
+    _description = 'API Connector In-Flight Slot'
+
+    # Leased with raw SQL by rate_limiter.RateLimiter; a lease expires on its own if its worker dies
+    key = fields.Char(required=True, index=True)
+    slot = fields.Integer(required=True)
+    leased_until = fields.Float('Leased Until (epoch)')
+
+    _sql_constraints = [
+        ('key_slot_uniq', 'unique(key, slot)', "This in-flight slot already exists."),
+    ]
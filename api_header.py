@@ -2,6 +2,7 @@ from odoo import api, fields, models
 
 class ApiHeader(models.Model):
     _name = 'api.header'
+    _inherit = ['api.connector.line.mixin']
     _description = 'API Headers'
 
     api_connector_id = fields.Many2one(
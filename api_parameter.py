@@ -2,6 +2,7 @@ from odoo import api, fields, models
 
 class ApiParameter(models.Model):
     _name = 'api.parameter'
+    _inherit = ['api.connector.line.mixin']
     _description = 'API Parameters'
     api_connector_id = fields.Many2one(
         comodel_name='api.connector',
@@ -1,6 +1,19 @@
-from odoo import api, fields, models
+import ast
+import logging
+
+from odoo import api, fields, models, tools
 from collections import defaultdict
 
+_logger = logging.getLogger(__name__)
+
+# Model operations watched by each kind of trigger
+TRIGGER_EVENTS = {
+    'on_create': ('create',),
+    'on_create_or_write': ('create', 'write'),
+    'on_write': ('write',),
+    'on_unlink': ('unlink',),
+}
+
 
 class BaseAutomation(models.Model):
     _inherit = 'base.automation'
@@ -20,12 +33,123 @@ class BaseAutomation(models.Model):
 
     action_server_id = fields.Many2one(ondelete='cascade')
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        res = super().create(vals_list)
+        self.clear_caches()
+        return res
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.clear_caches()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.clear_caches()
+        return res
+
+    @tools.ormcache()
+    def _get_trigger_index(self):
+        """ Map model name and event to (any field triggers, names of the watched trigger fields).
+
+        Lets the patched methods return straight away on operations no active trigger can react to.
+        """
+        index = defaultdict(dict)
+        for trigger in self.sudo().with_context(active_test=True).search([]):
+            for event in TRIGGER_EVENTS.get(trigger.trigger, ()):
+                any_field, watched = index[trigger.model_name].get(event, (False, frozenset()))
+                if trigger.trigger_field_ids:
+                    watched |= frozenset(trigger.trigger_field_ids.mapped('name'))
+                else:
+                    any_field = True
+                index[trigger.model_name][event] = (any_field, watched)
+        return dict(index)
+
+    @api.model
+    def _get_watched_fields(self, model_name, event):
+        """ Return (any field triggers, watched field names), or None when no trigger watches the event. """
+        return self._get_trigger_index().get(model_name, {}).get(event)
+
+    @tools.ormcache()
+    def _get_trigger_domains(self):
+        """ Map trigger id to its (pre, post) filter domains, parsed once per registry.
+
+        A domain is left to ``None`` when it is empty or needs the evaluation context (``uid``, ``time``...),
+        it is then evaluated on each call as the base automations do.
+        """
+        domains = {}
+        for trigger in self.sudo().with_context(active_test=True).search([]):
+            domains[trigger.id] = tuple(
+                self._compile_domain(domain) for domain in (trigger.filter_pre_domain, trigger.filter_domain))
+        return domains
+
+    @staticmethod
+    def _compile_domain(domain):
+        if not domain:
+            return None
+        try:
+            return ast.literal_eval(domain)
+        except (ValueError, SyntaxError):
+            return None
+
+    def _filter_pre(self, records):
+        domain = self._get_trigger_domains().get(self.id, (None, None))[0]
+        if domain is None or not records:
+            return super()._filter_pre(records)
+        return records.sudo().filtered_domain(domain).with_env(records.env)
+
+    def _filter_post_export_domain(self, records):
+        domain = self._get_trigger_domains().get(self.id, (None, None))[1]
+        if domain is None or not records:
+            return super()._filter_post_export_domain(records)
+        return records.sudo().filtered_domain(domain).with_env(records.env), domain
+
+    def _process(self, records, domain_post=None):
+        """ Run connector actions once for the whole recordset so requests can be fanned out. """
+        action_server = self.action_server_id
+        if not (action_server.is_connector_action and len(records) > 1):
+            return super()._process(records, domain_post=domain_post)
+
+        # filter out the records on which self has already been done
+        automation_done = self._context.get('__action_done', {})
+        records_done = automation_done.get(self, records.browse())
+        records -= records_done
+        if not records:
+            return
+
+        # mark the remaining records as done (to avoid recursive processing)
+        automation_done = dict(automation_done)
+        automation_done[self] = records_done + records
+        self = self.with_context(__action_done=automation_done)
+        records = records.with_context(__action_done=automation_done)
+
+        if 'date_action_last' in records._fields:
+            records.write({'date_action_last': fields.Datetime.now()})
+
+        records = records.filtered(self._check_trigger_fields)
+        if not records:
+            return
+        ctx = {
+            'active_model': records._name,
+            'active_ids': records.ids,
+            'active_id': records[:1].id,
+            'domain_post': domain_post,
+        }
+        try:
+            action_server.sudo().with_context(**ctx).run()
+        except Exception as e:
+            self._add_postmortem_action(e)
+            raise e
+
     def _register_hook(self):
         def make_create():
             """ Instanciate a create method that processes action rules. """
 
             @api.model_create_multi
             def create(self, vals_list, **kw):
+                if self.env['base.automation.api.trigger']._get_watched_fields(self._name, 'create') is None:
+                    return create.origin(self, vals_list, **kw)
                 # retrieve the action rules to possibly execute
                 actions = self.env['base.automation.api.trigger']._get_actions(self,
                                                                                ['on_create', 'on_create_or_write'])
@@ -44,6 +168,9 @@ class BaseAutomation(models.Model):
             """ Instanciate a write method that processes action rules. """
 
             def write(self, vals, **kw):
+                watched = self.env['base.automation.api.trigger']._get_watched_fields(self._name, 'write')
+                if watched is None or not (watched[0] or watched[1].intersection(vals)):
+                    return write.origin(self, vals, **kw)
                 # retrieve the action rules to possibly execute
                 actions = self.env['base.automation.api.trigger']._get_actions(self, ['on_write', 'on_create_or_write'])
                 if not (actions and self):
@@ -51,11 +178,12 @@ class BaseAutomation(models.Model):
                 records = self.with_env(actions.env).filtered('id')
                 # check preconditions on records
                 pre = {action: action._filter_pre(records) for action in actions}
-                # read old values before the update
-                old_values = {
-                    old_vals.pop('id'): old_vals
-                    for old_vals in (records.read(list(vals)) if vals else [])
-                }
+                # read old values before the update, only for the written fields a trigger compares
+                old_fields = [name for name in vals if name in watched[1]]
+                # one entry per record even without fields to read: empty old values would mean a create
+                old_values = {record.id: {} for record in records}
+                if old_fields:
+                    old_values.update((old_vals.pop('id'), old_vals) for old_vals in records.read(old_fields))
                 # call original method
                 write.origin(self.with_env(actions.env), vals, **kw)
                 # check postconditions, and execute actions on the records that satisfy them
@@ -77,6 +205,10 @@ class BaseAutomation(models.Model):
                 stored_fields = [f for f in self.pool.field_computed[field] if f.store]
                 if not any(stored_fields):
                     return _compute_field_value.origin(self, field)
+                stored_names = [f.name for f in stored_fields]
+                watched = self.env['base.automation.api.trigger']._get_watched_fields(self._name, 'write')
+                if watched is None or not (watched[0] or watched[1].intersection(stored_names)):
+                    return _compute_field_value.origin(self, field)
                 # retrieve the action rules to possibly execute
                 actions = self.env['base.automation.api.trigger']._get_actions(self, ['on_write', 'on_create_or_write'])
                 records = self.filtered('id').with_env(actions.env)
@@ -85,11 +217,11 @@ class BaseAutomation(models.Model):
                     return True
                 # check preconditions on records
                 pre = {action: action._filter_pre(records) for action in actions}
-                # read old values before the update
-                old_values = {
-                    old_vals.pop('id'): old_vals
-                    for old_vals in (records.read([f.name for f in stored_fields]))
-                }
+                # read old values before the update, only for the recomputed fields a trigger compares
+                old_fields = [name for name in stored_names if name in watched[1]]
+                old_values = {record.id: {} for record in records}
+                if old_fields:
+                    old_values.update((old_vals.pop('id'), old_vals) for old_vals in records.read(old_fields))
                 # call original method
                 _compute_field_value.origin(self, field)
                 # check postconditions, and execute actions on the records that satisfy them
@@ -104,6 +236,8 @@ class BaseAutomation(models.Model):
             """ Instanciate an unlink method that processes action rules. """
 
             def unlink(self, **kwargs):
+                if self.env['base.automation.api.trigger']._get_watched_fields(self._name, 'unlink') is None:
+                    return unlink.origin(self, **kwargs)
                 # retrieve the action rules to possibly execute
                 actions = self.env['base.automation.api.trigger']._get_actions(self, ['on_unlink'])
                 records = self.with_env(actions.env)
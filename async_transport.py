@@ -0,0 +1,144 @@
+import asyncio
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from .compression import READ_CHUNK, check_size
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2
+except ImportError:
+    h2 = None
+
+
+def to_requests_response(r, content):
+    """ Present an httpx response as a requests one, so parsing, caching and logging stay transport agnostic. """
+    response = requests.Response()
+    response.status_code = r.status_code
+    response.headers = CaseInsensitiveDict(r.headers.multi_items())
+    response._content = content
+    response.encoding = r.encoding
+    response.reason = r.reason_phrase
+    response.url = str(r.url)
+    response.elapsed = r.elapsed
+    request = requests.PreparedRequest()
+    request.method = r.request.method
+    request.url = str(r.request.url)
+    request.headers = CaseInsensitiveDict(r.request.headers.multi_items())
+    request.body = r.request.content
+    response.request = request
+    return response
+
+
+class AsyncSession:
+    """ Blocking facade with the ``request(**kwargs)`` signature of a requests session. """
+
+    def __init__(self, transport, pool_size, http2, keep_alive, max_bytes):
+        self.transport = transport
+        self.options = {'pool_size': pool_size, 'http2': http2, 'keep_alive': keep_alive, 'max_bytes': max_bytes}
+
+    def request(self, **request_kwargs):
+        return self.transport.run(self.transport.request(request_kwargs, **self.options))
+
+
+class AsyncTransport:
+    """ Per-worker event loop thread running pooled httpx clients, usable from synchronous code.
+
+    Requests submitted from any thread share the loop: hundreds of calls can be in flight without holding
+    a thread each, and HTTP/2 connections multiplex them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._pid = None
+        self._clients = {}
+
+    @property
+    def available(self):
+        return httpx is not None
+
+    @property
+    def http2_available(self):
+        # httpx only negotiates HTTP/2 with the h2 package installed, and fails at the first request otherwise
+        return httpx is not None and h2 is not None
+
+    def _get_loop(self):
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                # a forked worker does not inherit the loop thread of its parent
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='api_connector_async', daemon=True).start()
+                self._loop, self._pid, self._clients = loop, os.getpid(), {}
+            return self._loop
+
+    def _get_client(self, url, pool_size, http2, keep_alive):
+        # only called from the loop thread, so the client dict needs no lock
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc, pool_size, http2, keep_alive)
+        client = self._clients.get(key)
+        if client is None:
+            limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size if keep_alive else 0)
+            client = self._clients[key] = httpx.AsyncClient(http2=http2, limits=limits)
+        return client
+
+    async def request(self, request_kwargs, pool_size=10, http2=False, keep_alive=True, max_bytes=0):
+        """ Send one request given as requests-style keyword arguments and return a requests response. """
+        kwargs = dict(request_kwargs)
+        method, url = kwargs.pop('method'), kwargs.pop('url')
+        connect, read = kwargs.pop('timeout', None) or (None, None)
+        data = kwargs.pop('data', None)
+        if isinstance(data, str):
+            data = data.encode()
+        # httpx takes raw bodies as content and form fields as data
+        body = {} if not data else {'content': data} if isinstance(data, bytes) else {'data': data}
+        client = self._get_client(url, pool_size, http2, keep_alive)
+        request = client.build_request(method, url, params=kwargs.get('params'), headers=kwargs.get('headers'),
+                                       json=kwargs.get('json'),
+                                       timeout=httpx.Timeout(None, connect=connect, read=read), **body)
+        try:
+            r = await client.send(request, stream=True)
+            try:
+                check_size(int(r.headers.get('Content-Length') or 0), max_bytes, url)
+                chunks = []
+                size = 0
+                async for chunk in r.aiter_bytes(READ_CHUNK):
+                    size += len(chunk)
+                    check_size(size, max_bytes, url)
+                    chunks.append(chunk)
+            finally:
+                await r.aclose()
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(str(e))
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(str(e))
+        return to_requests_response(r, b''.join(chunks))
+
+    def session(self, pool_size=10, http2=False, keep_alive=True, max_bytes=0):
+        return AsyncSession(self, pool_size, http2, keep_alive, max_bytes)
+
+    def run(self, coroutine):
+        """ Run a coroutine on the transport loop and wait for its result. """
+        return asyncio.run_coroutine_threadsafe(coroutine, self._get_loop()).result()
+
+    def gather(self, send, requests_kwargs, limit):
+        """ Send all requests at once through the coroutine function ``send``, at most ``limit`` in flight. """
+        async def gather_limited():
+            semaphore = asyncio.Semaphore(limit)
+
+            async def bounded(request_kwargs):
+                async with semaphore:
+                    return await send(request_kwargs)
+            return await asyncio.gather(*(bounded(request_kwargs) for request_kwargs in requests_kwargs))
+        return self.run(gather_limited())
+
+
+async_transport = AsyncTransport()
@@ -0,0 +1,77 @@
+import datetime
+import json
+import re
+from functools import lru_cache
+
+_PLACEHOLDER = re.compile(r'\{\{\s*([A-Za-z_][\w.]*)\s*\}\}')
+
+
+class BodyTemplate:
+    """ A request body split once into literal chunks and ``{{ field.path }}`` placeholders. """
+
+    __slots__ = ('parts', 'paths')
+
+    def __init__(self, parts):
+        self.parts = parts
+        self.paths = tuple(dict.fromkeys(part for part in parts if isinstance(part, tuple)))
+
+    def render(self, record, encode):
+        return ''.join(encode(resolve(record, part)) if isinstance(part, tuple) else part for part in self.parts)
+
+
+@lru_cache(maxsize=256)
+def compile_body(text):
+    """ Compile a body template; literal text is kept verbatim and placeholders become field paths. """
+    parts = []
+    position = 0
+    for match in _PLACEHOLDER.finditer(text or ''):
+        if match.start() > position:
+            parts.append(text[position:match.start()])
+        parts.append(tuple(match.group(1).split('.')))
+        position = match.end()
+    if position < len(text or ''):
+        parts.append(text[position:])
+    return BodyTemplate(tuple(parts))
+
+
+def resolve(record, path):
+    """ Follow a field path from ``record``; relational values end up as ids, empty values as None.
+
+    Without a record it is None.
+    """
+    if record is None:
+        return None
+    value = record
+    for name in path:
+        field = value._fields.get(name)
+        if field is None:
+            raise KeyError("%s has no field %s" % (value._name, name))
+        value = value[name]
+    if field.type == 'many2one':
+        return value.id or None
+    if field.type in ('one2many', 'many2many'):
+        return value.ids
+    if value is False and field.type != 'boolean':
+        # the ORM reads empty values as False, they are sent as null
+        return None
+    return value
+
+
+def to_json_value(value):
+    """ Convert an ORM field value to the JSON value sent in a body. """
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.decode()
+    return value
+
+
+def encode_json(value):
+    return json.dumps(to_json_value(value))
+
+
+def encode_text(value):
+    value = to_json_value(value)
+    if value is False or value is None:
+        return ''
+    return str(value)
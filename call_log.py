@@ -0,0 +1,55 @@
+import base64
+import threading
+import time
+import zlib
+from collections import defaultdict, deque
+from datetime import datetime
+
+# A worker writes its buffered call logs once this many are waiting, or after FLUSH_INTERVAL seconds
+FLUSH_SIZE = 200
+FLUSH_INTERVAL = 30
+
+
+class CallLogBuffer:
+    """ Per-worker buffer of sampled call logs, one queue per database, written to the database in batches. """
+
+    def __init__(self):
+        self._entries = defaultdict(deque)
+        self._lock = threading.Lock()
+        self._last_flush = {}
+
+    def append(self, dbname, entry):
+        with self._lock:
+            self._entries[dbname].append(entry)
+
+    def flush_due(self, dbname):
+        entries = self._entries.get(dbname)
+        last_flush = self._last_flush.setdefault(dbname, time.monotonic())
+        return bool(entries) and (len(entries) >= FLUSH_SIZE or time.monotonic() - last_flush >= FLUSH_INTERVAL)
+
+    def drain(self, dbname):
+        with self._lock:
+            entries = list(self._entries.pop(dbname, ()))
+            self._last_flush[dbname] = time.monotonic()
+        return entries
+
+
+def make_entry(connector_id, request_kwargs, r, error, duration_ms, body_limit):
+    """ Build a call log row from a finished request; called from fan-out threads, so no ORM access. """
+    request_body = r.request.body if r is not None else None
+    response_body = r.content if r is not None else b''
+    return {
+        'connector_id': connector_id,
+        'call_date': datetime.utcnow(),
+        'success': r is not None and r.status_code < 400,
+        'status_code': r.status_code if r is not None else None,
+        'duration_ms': duration_ms,
+        'request_size': len(request_body or b''),
+        'response_size': len(response_body),
+        'url': (r.url if r is not None else request_kwargs['url'])[:2048],
+        'error': error and str(error)[:1024],
+        'body': base64.b64encode(zlib.compress(response_body[:body_limit])) if response_body and body_limit else None,
+    }
+
+
+call_log_buffer = CallLogBuffer()
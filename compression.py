@@ -0,0 +1,127 @@
+import base64
+import gzip
+import json
+
+from odoo.exceptions import UserError
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    # urllib3 2 advertises the encodings it can decode, zstd only when its own zstandard support is usable
+    from urllib3.util.request import ACCEPT_ENCODING as URLLIB3_ENCODINGS
+except ImportError:
+    URLLIB3_ENCODINGS = ''
+
+# Accept-Encoding header sent for each connector setting
+ACCEPT_ENCODINGS = {
+    'identity': 'identity',
+    'gzip': 'gzip, deflate',
+    'br': 'br, gzip, deflate',
+    'zstd': 'zstd, br, gzip, deflate',
+}
+
+# Bytes read from a response body at a time when its size is capped
+READ_CHUNK = 64 * 1024
+
+
+class ResponseTooLarge(UserError):
+    pass
+
+
+def zstd_decodable(transport='sync'):
+    """ Whether the HTTP client of the transport decodes zstd bodies, which older urllib3 and httpx do not. """
+    if zstandard is None:
+        return False
+    if transport == 'async':
+        try:
+            from httpx._decoders import SUPPORTED_DECODERS
+        except ImportError:
+            return False
+        return 'zstd' in SUPPORTED_DECODERS
+    return 'zstd' in URLLIB3_ENCODINGS
+
+
+def encoding_available(accept_encoding, transport='sync'):
+    """ Whether responses in the accepted encodings can be decoded in this worker. """
+    if accept_encoding == 'zstd':
+        return zstd_decodable(transport) and brotli is not None
+    if accept_encoding == 'br':
+        return brotli is not None
+    return True
+
+
+def prepare_outgoing(request_kwargs, accept_encoding=None, compress_body=False):
+    """ Return the request kwargs with the negotiated Accept-Encoding and, when asked, a gzipped body. """
+    headers = dict(request_kwargs.get('headers') or {})
+    if accept_encoding:
+        headers['Accept-Encoding'] = ACCEPT_ENCODINGS[accept_encoding]
+    request_kwargs = dict(request_kwargs, headers=headers)
+    if compress_body:
+        body = request_kwargs.pop('json', None)
+        if body is not None:
+            headers.setdefault('Content-Type', 'application/json')
+            body = json.dumps(body)
+        else:
+            body = request_kwargs.pop('data', None)
+        if isinstance(body, str):
+            body = body.encode()
+        if body and isinstance(body, bytes):
+            request_kwargs['data'] = gzip.compress(body)
+            headers['Content-Encoding'] = 'gzip'
+        elif body:
+            # form fields cannot be compressed, send them as they are
+            request_kwargs['data'] = body
+    return request_kwargs
+
+
+def check_size(size, max_bytes, url):
+    if max_bytes and size > max_bytes:
+        raise ResponseTooLarge("The response of %s exceeds the maximum size of %s bytes" % (url, max_bytes))
+
+
+class LimitedSession:
+    """ Session wrapper streaming response bodies and aborting as soon as they exceed ``max_bytes``. """
+
+    def __init__(self, session, max_bytes):
+        self.session = session
+        self.max_bytes = max_bytes
+
+    def request(self, **request_kwargs):
+        r = self.session.request(stream=True, **request_kwargs)
+        try:
+            check_size(int(r.headers.get('Content-Length') or 0), self.max_bytes, request_kwargs['url'])
+            chunks = []
+            size = 0
+            # iter_content yields decoded bytes: a small compressed body cannot inflate past the limit
+            for chunk in r.iter_content(READ_CHUNK):
+                size += len(chunk)
+                check_size(size, self.max_bytes, request_kwargs['url'])
+                chunks.append(chunk)
+            r._content = b''.join(chunks)
+        finally:
+            r.close()
+        return r
+
+
+def compress_text(text):
+    """ Gzip a stored response, returned base64-encoded for a binary field. """
+    if not text:
+        return False
+    return base64.b64encode(gzip.compress(text.encode()))
+
+
+def decompress_text(data):
+    if not data:
+        return False
+    return gzip.decompress(base64.b64decode(data)).decode()
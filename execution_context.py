@@ -0,0 +1,12 @@
+class ExecutionContext:
+    """ Per-call state of a connector run, carried in memory from the trigger to the response mapping.
+
+    Keeping it off the api.connector record leaves that record as read-only configuration, so
+    concurrent triggers never contend for its row lock.
+    """
+    __slots__ = ('event_record', 'response_object', 'values')
+
+    def __init__(self, event_record=None, response_object=None):
+        self.event_record = event_record
+        self.response_object = response_object
+        self.values = None
@@ -1,44 +1,106 @@
-from odoo import api, fields, models
-import base64
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from odoo import api, fields, models, tools
+import io
 import json
 
+# Connectors whose lines are read together; the ORM cache is emptied between two batches
+EXPORT_BATCH_SIZE = 500
+
+COLLECTION_SCHEMAS = {
+    '2.0': "https://schema.getpostman.com/json/collection/v2.0.0/",
+    '2.1': "https://schema.getpostman.com/json/collection/v2.1.0/collection.json",
+}
+
 
 class ExportPostmanCollection(models.TransientModel):
     _name = 'export.postman.collection'
     _description = 'This is a wizard to export as a Postman collection'
 
-    postman_collection = fields.Binary()
+    connector_ids = fields.Many2many('api.connector', string='Connectors')
+    schema_version = fields.Selection([('2.1', 'v2.1'), ('2.0', 'v2.0')], string='Collection Format',
+                                      default='2.1', required=True)
 
     def get_export_data_text(self, export_ids):
-        item = []
-        for con in self.env['api.connector'].browse(export_ids):
-            request = {
-                "auth": con.get_export_auth(),
-                "method": con.request_type,
-                "header":con.get_export_header(),
-                "url": con.get_export_url(),
-            }
-            item_single = {
-                "name": con.name,
-                "request": request
-            }
-            item.append(item_single)
-        return json.dumps({
-            "info": {
+        buffer = io.StringIO()
+        self._write_collection(buffer, export_ids)
+        return buffer.getvalue()
+
+    def _write_collection(self, stream, export_ids):
+        """ Write the collection to a text stream one item at a time, never holding the whole document. """
+        version = self.schema_version or '2.1'
+        stream.write('{"info": %s, "item": [' % json.dumps({
             "name": "Exported Odoo API connectors",
-            "version": "v2.0.0",
+            "version": "v%s.0" % version,
             "description": "This group of API connectors has been exported from Odoo",
-            "schema": "https://schema.getpostman.com/json/collection/v2.0.0/"
-            },
-            "item": item
-        })
+            "schema": COLLECTION_SCHEMAS[version],
+        }))
+        separator = ''
+        for item in self._iter_export_items(export_ids, version):
+            stream.write(separator)
+            json.dump(item, stream)
+            separator = ', '
+        stream.write(']}')
+
+    def _iter_export_items(self, export_ids, version):
+        for ids in tools.split_every(EXPORT_BATCH_SIZE, export_ids, list):
+            connectors = self.env['api.connector'].browse(ids).exists()
+            lines = self._read_export_lines(connectors.ids)
+            for con in connectors:
+                request = {
+                    "auth": con.get_export_auth(version),
+                    "method": con.request_type,
+                    "header": [
+                        {"key": key, "value": value, "type": "text"} for key, value in lines['api.header'][con.id]
+                    ],
+                    "url": self._get_export_url(con.url, lines['add.to.url'][con.id],
+                                                lines['api.parameter'][con.id], version),
+                }
+                yield {"name": con.name, "request": request}
+            self.env.invalidate_all()
+
+    @api.model
+    def _read_export_lines(self, connector_ids):
+        """ Read the static lines of many connectors with one query per line model, grouped by connector. """
+        lines = {}
+        for model_name in ('api.header', 'api.parameter', 'add.to.url'):
+            grouped = defaultdict(list)
+            for row in self.env[model_name].search_read([('api_connector_id', 'in', connector_ids)],
+                                                        ['api_connector_id', 'key', 'static_value']):
+                grouped[row['api_connector_id'][0]].append((row['key'], row['static_value']))
+            lines[model_name] = grouped
+        return lines
+
+    @staticmethod
+    def _get_export_url(base_url, url_segments, parameters, version):
+        url = base_url
+        for _key, value in url_segments:
+            url = f'{url}/{value}'
+        query = '&'.join(f"{key}={value}" for key, value in parameters)
+        raw = f'{url}?{query}' if query else url
+        if version == '2.0':
+            return raw
+        # v2.1 URL object: the raw form plus its parsed host, path and query parts
+        parts = urlsplit(url)
+        url_object = {
+            "raw": raw,
+            "protocol": parts.scheme,
+            "host": parts.hostname.split('.') if parts.hostname else [],
+            "path": [segment for segment in parts.path.split('/') if segment],
+        }
+        if parts.port:
+            url_object["port"] = str(parts.port)
+        if parameters:
+            url_object["query"] = [{"key": key, "value": value} for key, value in parameters]
+        return url_object
 
     def download_postman_collection(self):
         selected_ids = self.env.context.get('active_ids', [])
-        self.postman_collection = base64.b64encode(bytes(self.get_export_data_text(selected_ids), encoding='utf8'))
+        self.connector_ids = [(6, 0, selected_ids)]
         return {
             'name': 'FEC',
             'type': 'ir.actions.act_url',
-            'url': f'/web/content/?model=export.postman.collection&id={self.id}&field=postman_collection&filename=odoo_postman_collection.json&download=true',
+            'url': f'/api_connector/export_postman/{self.id}',
             'target': 'self',
         }
@@ -0,0 +1,48 @@
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class SessionRegistry:
+    """ Per-worker registry of pooled, keep-alive sessions keyed by scheme and host. """
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_session(self, url, pool_size=10, max_retries=0, backoff_factor=0.0, keep_alive=True):
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc, pool_size, max_retries, backoff_factor, keep_alive)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None:
+                self.hits += 1
+                return session
+            self.misses += 1
+            session = requests.Session()
+            # urllib3's default methods only: a POST or PATCH whose answer was lost may already have been applied
+            retry = Retry(total=max_retries, backoff_factor=backoff_factor, raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+            session.mount(f'{parts.scheme}://', adapter)
+            if not keep_alive:
+                session.headers['Connection'] = 'close'
+            self._sessions[key] = session
+            return session
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'sessions': len(self._sessions)}
+
+    def clear(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+session_registry = SessionRegistry()
@@ -1,11 +1,50 @@
 import base64
+import binascii
+import io
 import json
+import logging
 import re
-import traceback
+from collections import Counter
 from json import JSONDecodeError
 from odoo.exceptions import UserError
 from odoo import api, fields, models
 
+try:
+    import ijson
+    JSON_ERRORS = (JSONDecodeError, UnicodeDecodeError, ijson.JSONError)
+except ImportError:
+    ijson = None
+    JSON_ERRORS = (JSONDecodeError, UnicodeDecodeError)
+
+_logger = logging.getLogger(__name__)
+
+# Connectors created per create() call, and interval of the progress log lines
+IMPORT_BATCH_SIZE = 500
+
+
+class _Base64Reader(io.RawIOBase):
+    """ File-like view decoding base64 data chunk by chunk, so the decoded document is never held whole. """
+
+    CHUNK = 4 * 16384
+
+    def __init__(self, encoded):
+        self.encoded = encoded.encode('ascii') if isinstance(encoded, str) else encoded
+        self.position = 0
+        self.pending = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.pending and self.position < len(self.encoded):
+            chunk = self.encoded[self.position:self.position + self.CHUNK]
+            self.position += self.CHUNK
+            self.pending = base64.b64decode(chunk, validate=True)
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
 
 class ImportPostmanCollection(models.Model):
     _name = 'import.postman.collection'
@@ -16,87 +55,119 @@ class ImportPostmanCollection(models.Model):
 
     @api.depends('json_file_for_import')
     def _compute_from_json_file(self):
-        if self._is_Base64(self.json_file_for_import) is not False:
-            string_variable = str(self.json_file_for_import)[1:]
-            try:
-                postman_collection_json = json.loads(base64.b64decode(string_variable))
-                for individual_request in postman_collection_json["item"]:
-                    converted_api_connector_record = self._convert_request_to_api_record(individual_request)
-                    self.env["api.connector"].create(converted_api_connector_record)
-                    individual_request_id = self.env["api.connector"].search([("name", "=", individual_request["name"])]).id
-                    self._create_request_header(individual_request["request"]["header"], individual_request_id)
-                    self._create_request_parameter(individual_request["request"], individual_request_id)
-                self.json_data = json.dumps(postman_collection_json, indent=4, sort_keys=True)
-            except JSONDecodeError:
-                raise UserError("Invalid POSTMAN Collection. Malformed JSON!!")
-            except ValueError:
-                raise UserError("A postman API with same name already exists")
-        else:
+        if not self.json_file_for_import:
             self.json_data = False
-
-    def _is_Base64(self, sb):
+            return
         try:
-            if isinstance(sb, str):
-                # If there's any unicode here, an exception will be thrown and the function will return false
-                sb_bytes = bytes(sb, 'ascii')
-            elif isinstance(sb, bytes):
-                sb_bytes = sb
-            else:
-                raise ValueError("Argument must be string or bytes")
-            return base64.b64encode(base64.b64decode(sb_bytes)) == sb_bytes
-        except Exception:
-            return False
-
-    def _convert_request_to_api_record(self, individual_request):
+            report = self._import_collection(io.BufferedReader(_Base64Reader(self.json_file_for_import)))
+        except binascii.Error:
+            self.json_data = False
+            return
+        except JSON_ERRORS as e:
+            raise UserError("Invalid POSTMAN Collection. Malformed JSON!!\n%s" % e)
+        self.json_data = json.dumps(report, indent=4, sort_keys=True)
+
+    def _import_collection(self, stream):
+        """ Create a connector for every request of the collection, folders included, in batched creates. """
+        report = {'imported': 0, 'folders': 0}
+        batch = []
+        for folder_count, vals in self._iter_collection_requests(stream):
+            report['folders'] = folder_count
+            batch.append(vals)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                self._create_connectors(batch)
+                report['imported'] += len(batch)
+                _logger.info("Postman import: %s requests imported", report['imported'])
+                batch = []
+        if batch:
+            self._create_connectors(batch)
+            report['imported'] += len(batch)
+        _logger.info("Postman import done: %s requests from %s folders", report['imported'], report['folders'])
+        return report
+
+    def _iter_top_level_items(self, stream):
+        if ijson is not None:
+            # only one top-level item (a request or a whole folder) is held in memory at a time
+            return ijson.items(stream, 'item.item', use_float=True)
+        return json.load(stream).get("item", [])
+
+    def _iter_collection_requests(self, stream):
+        """ Walk the collection without recursion; yield (folders seen, connector values) for every request. """
+        folder_count = 0
+        for top_item in self._iter_top_level_items(stream):
+            stack = [((), top_item)]
+            while stack:
+                folder_path, item = stack.pop()
+                if "item" in item:
+                    folder_count += 1
+                    path = folder_path + (item.get("name") or '',)
+                    stack.extend((path, child) for child in reversed(item["item"]))
+                elif "request" in item:
+                    yield folder_count, self._convert_request_to_api_record(item, folder_path)
+
+    def _create_connectors(self, vals_list):
+        names = Counter(vals["name"] for vals in vals_list)
+        duplicates = {name for name, count in names.items() if count > 1}
+        duplicates.update(self.env["api.connector"].search([("name", "in", list(names))]).mapped("name"))
+        if duplicates:
+            raise UserError("A postman API with same name already exists: %s" % ', '.join(sorted(duplicates)))
+        self.env["api.connector"].create(vals_list)
+
+    def _convert_request_to_api_record(self, individual_request, folder_path=()):
+        request = individual_request["request"]
+        if isinstance(request, str):
+            request = {"url": request, "method": "GET"}
         api_connector_record = {}
-        api_connector_record["name"] = individual_request["name"]
+        api_connector_record["name"] = '/'.join(folder_path + (individual_request["name"],))
         api_connector_record["request_method"] = "REST"
-        if isinstance(individual_request["request"]["url"], dict):
-            url_body = individual_request["request"]["url"]
+        if isinstance(request["url"], dict):
+            url_body = request["url"]
             result = re.search("[^?]*", url_body['raw'])
             api_connector_record["url"] = result.group()
         else:
-            api_connector_record["url"] = individual_request["request"]["url"]
-        api_connector_record["request_type"] = individual_request["request"]["method"]
-        auth_dict = self._add_auth_fields_to_record(individual_request["request"]["auth"])
+            api_connector_record["url"] = request["url"]
+        api_connector_record["request_type"] = request.get("method", "GET")
+        auth_dict = self._add_auth_fields_to_record(request.get("auth") or {"type": "noauth"})
         api_connector_record.update(auth_dict)
-
+        api_connector_record["header_line"] = self._get_header_commands(request.get("header") or [])
+        api_connector_record["parameter_line"] = self._get_parameter_commands(request)
         return api_connector_record
 
     def _add_auth_fields_to_record(self, auth_body):
         auth_record = {}
         if auth_body["type"] == "basic":
             auth_record["authorization"] = 'Basic Auth'
-            auth_record["basic_auth_user_name"] = auth_body['basic']["username"]
-            auth_record["basic_auth_password"] = auth_body['basic']["password"]
+            auth_record["basic_auth_user_name"] = self._get_auth_value(auth_body['basic'], "username")
+            auth_record["basic_auth_password"] = self._get_auth_value(auth_body['basic'], "password")
 
         elif auth_body["type"] == "oauth2":
             auth_record["authorization"] = 'O Auth 2'
-            auth_record["oauth_authorization_url"] = auth_body['oauth2']["accessTokenUrl"]
-            auth_record["oauth_client_id"] = auth_body['oauth2']["clientId"]
-            auth_record["oauth_client_secret"] = auth_body['oauth2']["clientSecret"]
-            auth_record["oauth_access_token_url"] = auth_body['oauth2']["accessTokenUrl"]
+            auth_record["oauth_authorization_url"] = self._get_auth_value(auth_body['oauth2'], "accessTokenUrl")
+            auth_record["oauth_client_id"] = self._get_auth_value(auth_body['oauth2'], "clientId")
+            auth_record["oauth_client_secret"] = self._get_auth_value(auth_body['oauth2'], "clientSecret")
+            auth_record["oauth_access_token_url"] = self._get_auth_value(auth_body['oauth2'], "accessTokenUrl")
 
         elif auth_body["type"] == "bearer":
             auth_record["authorization"] = 'Bearer'
-            auth_record["bearer_token"] = auth_body['bearer']["token"]
+            auth_record["bearer_token"] = self._get_auth_value(auth_body['bearer'], "token")
         else:
             auth_record["authorization"] = 'No Auth'
         return auth_record
 
-    def _create_request_header(self, header_array, api_connector_id):
-        header_dict = {}
-        for header in header_array:
-            header_dict["key"] = header["key"]
-            header_dict["static_value"] = header["value"]
-            header_dict["api_connector_id"] = api_connector_id
-            self.env["api.header"].create(header_dict)
+    @staticmethod
+    def _get_auth_value(auth_values, key):
+        # collection v2.0 stores auth values as a dict, v2.1 as a list of {key, value} pairs
+        if isinstance(auth_values, list):
+            return next((entry.get("value") for entry in auth_values if entry.get("key") == key), False)
+        return auth_values.get(key, False)
 
-    def _create_request_parameter(self, request, api_connector_id):
-        parameter_dict = {}
-        if isinstance(request["url"], dict):
-            for parameters in request["url"]["query"]:
-                parameter_dict["key"] = parameters["key"]
-                parameter_dict["static_value"] = parameters["value"]
-                parameter_dict["api_connector_id"] = api_connector_id
-                self.env["api.parameter"].create(parameter_dict)
+    def _get_header_commands(self, header_array):
+        return [(0, 0, {"key": header["key"], "static_value": header.get("value")}) for header in header_array]
+
+    def _get_parameter_commands(self, request):
+        if not isinstance(request["url"], dict):
+            return []
+        return [
+            (0, 0, {"key": parameters["key"], "static_value": parameters.get("value")})
+            for parameters in request["url"].get("query") or []
+        ]
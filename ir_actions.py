@@ -11,10 +11,32 @@ class IrActionsServer(models.Model):
 
     def _get_runner(self):
         if self.is_connector_action:
-            return type(self)._run_action_api_call, False
+            # multi runner: the records of a trigger reach the connector together instead of one call each
+            return type(self)._run_action_api_call, True
         return super()._get_runner()
 
     def _run_action_api_call(self, eval_context):
-        event_record = self.env[self.model_id.model].browse(self._context.get('active_id'))
-        self.action_api_connector_id.send_request(event_record)
-        self.action_api_connector_id.trigger_response()
+        connector = self.action_api_connector_id
+        active_id = self._context.get('active_id')
+        active_ids = self._context.get('active_ids') or ([active_id] if active_id else [])
+        if not active_ids:
+            return
+        if connector.execution_mode == 'deferred':
+            self.env['api.connector.job'].sudo()._enqueue(connector, self.model_id.model, active_ids)
+            return
+        if len(active_ids) > 1:
+            return self._run_action_api_call_batch(eval_context)
+        event_record = self.env[self.model_id.model].browse(active_ids[0])
+        connector._process_event_record(event_record)
+
+    def _run_action_api_call_batch(self, eval_context):
+        connector = self.action_api_connector_id
+        event_records = self.env[self.model_id.model].browse(self._context.get('active_ids'))
+        if connector.pagination_mode != 'none':
+            for event_record in event_records:
+                connector._process_event_record(event_record)
+            return
+        if connector.batch_mode != 'off':
+            return connector.trigger_response_batch(connector.send_request_bulk(event_records))
+        results = connector.send_request_batch(event_records)
+        connector.trigger_response_batch(results)
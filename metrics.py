@@ -0,0 +1,88 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Upper bounds of the latency histogram buckets, in milliseconds; the last bucket is +Inf
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Seconds between two flushes of a worker's histograms to the database
+FLUSH_INTERVAL = 60
+
+
+class Histogram:
+    __slots__ = ('counts', 'total_ms')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+
+    def observe(self, duration_ms):
+        self.counts[bisect_left(BUCKETS_MS, duration_ms)] += 1
+        self.total_ms += duration_ms
+
+
+class MetricsRegistry:
+    """ Per-worker latency histograms keyed by database, then by (connector id, phase).
+
+    A worker may serve several databases whose connector ids overlap, so every database keeps its own buffer.
+    """
+
+    def __init__(self):
+        self._histograms = defaultdict(lambda: defaultdict(Histogram))
+        self._lock = threading.Lock()
+        self._last_flush = {}
+
+    def observe(self, dbname, connector_id, phase, duration_ms):
+        with self._lock:
+            self._histograms[dbname][connector_id, phase].observe(duration_ms)
+
+    @contextmanager
+    def timer(self, dbname, connector_id, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(dbname, connector_id, phase, (time.perf_counter() - start) * 1000)
+
+    def flush_due(self, dbname):
+        last_flush = self._last_flush.setdefault(dbname, time.monotonic())
+        return time.monotonic() - last_flush >= FLUSH_INTERVAL
+
+    def drain(self, dbname):
+        """ Return and reset the histograms of ``dbname`` gathered since its last flush. """
+        with self._lock:
+            histograms = self._histograms.pop(dbname, {})
+            self._last_flush[dbname] = time.monotonic()
+        return histograms
+
+    def requeue(self, dbname, histograms):
+        """ Put back histograms whose flush failed, so they go out with the next one. """
+        with self._lock:
+            pending = self._histograms[dbname]
+            for key, histogram in histograms.items():
+                target = pending[key]
+                target.counts = [a + b for a, b in zip(target.counts, histogram.counts)]
+                target.total_ms += histogram.total_ms
+
+
+def format_prometheus(rows):
+    """ Render (connector name, phase, bucket counts, total ms) rows as Prometheus text exposition. """
+    lines = [
+        '# HELP api_connector_phase_duration_seconds Time spent per connector and request phase.',
+        '# TYPE api_connector_phase_duration_seconds histogram',
+    ]
+    for connector, phase, counts, total_ms in rows:
+        labels = 'connector="%s",phase="%s"' % (connector.replace('\\', '\\\\').replace('"', '\\"'), phase)
+        cumulative = 0
+        for bound, count in zip(BUCKETS_MS + ('+Inf',), counts):
+            cumulative += count
+            le = bound if bound == '+Inf' else bound / 1000
+            lines.append('api_connector_phase_duration_seconds_bucket{%s,le="%s"} %d' % (labels, le, cumulative))
+        lines.append('api_connector_phase_duration_seconds_sum{%s} %f' % (labels, total_ms / 1000))
+        lines.append('api_connector_phase_duration_seconds_count{%s} %d' % (labels, cumulative))
+    return '\n'.join(lines) + '\n'
+
+
+metrics_registry = MetricsRegistry()
@@ -0,0 +1,17 @@
+import psycopg2
+
+from odoo.addons.api_connector.compression import compress_text
+
+
+def migrate(cr, version):
+    """ Move the responses stored as text before compression into the gzipped column, then drop the text one. """
+    cr.execute("""
+        SELECT 1 FROM information_schema.columns WHERE table_name = 'api_connector' AND column_name = 'response'
+    """)
+    if not cr.fetchone():
+        return
+    cr.execute("SELECT id, response FROM api_connector WHERE response IS NOT NULL AND response != ''")
+    for connector_id, response in cr.fetchall():
+        cr.execute("UPDATE api_connector SET response_compressed = %s WHERE id = %s",
+                   [psycopg2.Binary(compress_text(response)), connector_id])
+    cr.execute("ALTER TABLE api_connector DROP COLUMN response")
@@ -0,0 +1,95 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockApiServer:
+    """ Local stand-in for a REST / GraphQL API, used by the tests and the benchmarks.
+
+    Every answer waits ``latency`` seconds, carries a ``payload_size`` bytes filler and fails with a 500
+    for a share ``error_rate`` of the calls. JSON array bodies are answered item by item, GraphQL queries
+    get a ``data`` object echoing their variables.
+    """
+
+    def __init__(self, latency=0.0, payload_size=0, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.payload_size = payload_size
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%s' % self._server.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='mock-api-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _answer(self, path, query, body):
+        with self._lock:
+            self.request_count += 1
+            failed = self.error_rate and self.random.random() < self.error_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            return 500, {'error': 'mock failure'}
+        filler = 'x' * self.payload_size
+        if isinstance(body, list):
+            return 200, [self._item(path, item, filler) for item in body]
+        if isinstance(body, dict) and 'query' in body:
+            return 200, {'data': {'echo': body.get('variables') or {}, 'filler': filler}}
+        return 200, self._item(path, dict(query, **(body if isinstance(body, dict) else {})), filler)
+
+    @staticmethod
+    def _item(path, values, filler):
+        item = dict(values.get('variables', values) if isinstance(values, dict) else {})
+        item.update(path=path, status='ok', filler=filler)
+        return item
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _handle(self):
+                path, _, query_string = self.path.partition('?')
+                query = dict(pair.partition('=')[::2] for pair in query_string.split('&') if pair)
+                length = int(self.headers.get('Content-Length') or 0)
+                raw_body = self.rfile.read(length) if length else b''
+                try:
+                    body = json.loads(raw_body) if raw_body else None
+                except ValueError:
+                    body = None
+                status, payload = server._answer(path, query, body)
+                content = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,52 @@
+import threading
+import time
+from collections import defaultdict, namedtuple
+
+OAuthToken = namedtuple('OAuthToken', ['access_token', 'expires_at'])
+
+# Tokens are refreshed this many seconds before they actually expire
+REFRESH_MARGIN = 60
+
+# Seconds a token is served from the process cache before the stored one is read again
+UNKNOWN_EXPIRY_TTL = 600
+
+# First key of the Postgres advisory lock guarding a connector's token refresh
+ADVISORY_LOCK_NAMESPACE = 7340
+
+
+class TokenCache:
+    """ Per-process cache of OAuth access tokens with one refresh lock per connector.
+
+    Entries are keyed by ``(dbname, connector_id)``: a worker serves several databases whose ids overlap. Each
+    entry remembers the generation it was cached under; a token cached under another generation is stale.
+    """
+
+    def __init__(self):
+        self._tokens = {}
+        self._locks = defaultdict(threading.Lock)
+        self._lock = threading.Lock()
+
+    def get(self, key, generation=None):
+        cached = self._tokens.get(key)
+        if cached is None:
+            return None
+        cached_generation, token, cached_until = cached
+        if cached_generation is not generation:
+            return None
+        if min(token.expires_at - REFRESH_MARGIN, cached_until) > time.time():
+            return token
+        return None
+
+    def put(self, key, token, generation=None):
+        # a token without known expiry is read again from the database from time to time
+        self._tokens[key] = (generation, token, time.time() + UNKNOWN_EXPIRY_TTL)
+
+    def discard(self, key):
+        self._tokens.pop(key, None)
+
+    def refresh_lock(self, key):
+        with self._lock:
+            return self._locks[key]
+
+
+token_cache = TokenCache()
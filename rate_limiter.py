@@ -0,0 +1,168 @@
+import logging
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+from odoo import sql_db
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+# Status codes telling us to slow down rather than reporting a failed request
+THROTTLE_STATUSES = {429, 503}
+
+# Longest pause between two attempts at taking an in-flight slot
+MAX_POLL_INTERVAL = 1.0
+
+
+class RateLimitExceeded(UserError):
+    pass
+
+
+def throttle_delay(r):
+    """ Return how many seconds the upstream asks us to wait, or None when the response is not throttled. """
+    retry_after = r.headers.get('Retry-After')
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    remaining = r.headers.get('X-RateLimit-Remaining') or r.headers.get('RateLimit-Remaining')
+    reset = r.headers.get('X-RateLimit-Reset') or r.headers.get('RateLimit-Reset')
+    if remaining == '0' and reset:
+        try:
+            reset = float(reset)
+        except ValueError:
+            reset = None
+        if reset is not None:
+            # either an epoch timestamp or a number of seconds, depending on the API
+            return max(0.0, reset - time.time()) if reset > 1e9 else reset
+    if r.status_code in THROTTLE_STATUSES:
+        return 1.0
+    return None
+
+
+class RateLimiter:
+    """ Token bucket and in-flight cap shared by every worker through the database.
+
+    Only plain values are kept, so a limiter can be used from the threads of a batch fan-out.
+    """
+
+    def __init__(self, dbname, key, rate=0.0, burst=1, max_in_flight=0, poll_interval=0.05, max_wait=60.0,
+                 lease_time=300.0):
+        self.dbname = dbname
+        self.key = key
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_in_flight = max_in_flight
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait
+        self.lease_time = lease_time
+
+    def _cursor(self):
+        return sql_db.db_connect(self.dbname).cursor()
+
+    def acquire(self):
+        """ Reserve one token, sleeping until the reservation is due; bursts are queued instead of refused. """
+        if not self.rate:
+            return 0.0
+        with self._cursor() as cr:
+            cr.execute("""
+                INSERT INTO api_connector_rate_bucket AS b (key, tokens, updated_at)
+                     VALUES (%(key)s, %(burst)s - 1, %(now)s)
+                ON CONFLICT (key) DO UPDATE
+                        SET tokens = LEAST(%(burst)s, b.tokens + GREATEST(0, %(now)s - b.updated_at) * %(rate)s) - 1,
+                            updated_at = GREATEST(b.updated_at, %(now)s)
+                  RETURNING tokens
+            """, {'key': self.key, 'burst': self.burst, 'rate': self.rate, 'now': time.time()})
+            tokens = cr.fetchone()[0]
+            wait = -tokens / self.rate if tokens < 0 else 0.0
+            if self.max_wait and wait > self.max_wait:
+                # give the token back instead of queueing past the deadline
+                cr.rollback()
+                raise RateLimitExceeded("The rate limit of %s would delay the request by %.0f seconds"
+                                        % (self.key, wait))
+            cr.commit()
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def penalize(self, seconds):
+        """ Empty the shared bucket for ``seconds`` so that every worker backs off together. """
+        _logger.info("Upstream %s throttled us, backing off for %.1fs", self.key, seconds)
+        if not self.rate:
+            time.sleep(min(seconds, self.max_wait) if self.max_wait else seconds)
+            return
+        with self._cursor() as cr:
+            cr.execute("""
+                UPDATE api_connector_rate_bucket
+                   SET tokens = LEAST(tokens, -%(seconds)s * %(rate)s), updated_at = %(now)s
+                 WHERE key = %(key)s
+            """, {'key': self.key, 'seconds': seconds, 'rate': self.rate, 'now': time.time()})
+            cr.commit()
+
+    @contextmanager
+    def slot(self):
+        """ Lease one of ``max_in_flight`` shared slots for the duration of a request.
+
+        No connection is held while the request runs or between two attempts, which back off up to
+        ``MAX_POLL_INTERVAL``. A lease left behind by a dead worker expires after ``lease_time`` seconds.
+        """
+        if not self.max_in_flight:
+            yield
+            return
+        deadline = time.monotonic() + self.max_wait if self.max_wait else None
+        interval = self.poll_interval
+        lease = self._lease_slot(create=True)
+        while lease is None:
+            if deadline is not None and time.monotonic() + interval > deadline:
+                raise RateLimitExceeded("No in-flight slot of %s was freed within %.0f seconds"
+                                        % (self.key, self.max_wait))
+            time.sleep(interval)
+            interval = min(interval * 2, MAX_POLL_INTERVAL)
+            lease = self._lease_slot()
+        try:
+            yield
+        finally:
+            with self._cursor() as cr:
+                # only release the lease if it did not expire and get taken over meanwhile
+                cr.execute("UPDATE api_connector_rate_slot SET leased_until = 0 WHERE id = %s AND leased_until = %s",
+                           list(lease))
+                cr.commit()
+
+    def _lease_slot(self, create=False):
+        """ Return (slot row id, lease expiry) of a free slot now leased to us, or None when all are taken. """
+        now = time.time()
+        with self._cursor() as cr:
+            if create:
+                cr.execute("""
+                    INSERT INTO api_connector_rate_slot (key, slot, leased_until)
+                         SELECT %s, n, 0 FROM generate_series(0, %s - 1) n
+                    ON CONFLICT (key, slot) DO NOTHING
+                """, [self.key, self.max_in_flight])
+            cr.execute("""
+                UPDATE api_connector_rate_slot
+                   SET leased_until = %(until)s
+                 WHERE id = (SELECT id FROM api_connector_rate_slot
+                              WHERE key = %(key)s AND slot < %(count)s AND leased_until < %(now)s
+                              ORDER BY slot LIMIT 1 FOR UPDATE SKIP LOCKED)
+             RETURNING id, leased_until
+            """, {'key': self.key, 'count': self.max_in_flight, 'now': now, 'until': now + self.lease_time})
+            row = cr.fetchone()
+            cr.commit()
+        return row
+
+    def request(self, session, request_kwargs):
+        """ Send a request within the limits. A throttled answer empties the shared bucket and is returned as is:
+        retrying it is left to the retry policy, the single retry layer of requests.
+        """
+        self.acquire()
+        with self.slot():
+            r = session.request(**request_kwargs)
+        delay = throttle_delay(r)
+        if delay is not None:
+            self.penalize(delay)
+        return r
@@ -0,0 +1,174 @@
+import asyncio
+import random
+import threading
+import time
+
+import requests
+
+from odoo.exceptions import UserError
+
+
+class CircuitOpenError(UserError):
+    pass
+
+
+class RetryPolicy:
+    """ Retry a request on selected statuses and connection errors, with exponential backoff and full jitter. """
+
+    def __init__(self, statuses=(), retry_exceptions=True, max_attempts=1, backoff=0.5, backoff_max=30.0,
+                 deadline=0.0):
+        self.statuses = frozenset(statuses)
+        self.retry_exceptions = retry_exceptions
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.deadline = deadline
+
+    def call(self, send, request_kwargs):
+        start = time.monotonic()
+        for attempt in range(1, self.max_attempts + 1):
+            error = r = None
+            try:
+                r = send(request_kwargs)
+            except requests.RequestException as e:
+                if not self.retry_exceptions:
+                    raise UserError("Request to %s failed\n%s" % (request_kwargs['url'], e))
+                error = e
+            else:
+                if r.status_code not in self.statuses:
+                    return r
+            if attempt == self.max_attempts:
+                break
+            delay = random.uniform(0, min(self.backoff_max, self.backoff * 2 ** (attempt - 1)))
+            if self.deadline and time.monotonic() - start + delay > self.deadline:
+                break
+            time.sleep(delay)
+        if error is not None:
+            raise UserError("Request to %s failed\n%s" % (request_kwargs['url'], error))
+        return r
+
+    async def acall(self, send, request_kwargs):
+        """ Same as call() for a coroutine function ``send``, waiting without blocking the event loop. """
+        start = time.monotonic()
+        for attempt in range(1, self.max_attempts + 1):
+            error = r = None
+            try:
+                r = await send(request_kwargs)
+            except requests.RequestException as e:
+                if not self.retry_exceptions:
+                    raise UserError("Request to %s failed\n%s" % (request_kwargs['url'], e))
+                error = e
+            else:
+                if r.status_code not in self.statuses:
+                    return r
+            if attempt == self.max_attempts:
+                break
+            delay = random.uniform(0, min(self.backoff_max, self.backoff * 2 ** (attempt - 1)))
+            if self.deadline and time.monotonic() - start + delay > self.deadline:
+                break
+            await asyncio.sleep(delay)
+        if error is not None:
+            raise UserError("Request to %s failed\n%s" % (request_kwargs['url'], error))
+        return r
+
+
+class CircuitBreaker:
+    """ Per-process breaker: opens after ``threshold`` consecutive failures and rejects calls for ``cooldown``. """
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def open_until(self):
+        return self.opened_at + self.cooldown if self.state != 'closed' else 0.0
+
+    def before_call(self, name):
+        with self._lock:
+            if self.state == 'open':
+                if time.time() < self.open_until:
+                    raise CircuitOpenError(
+                        "Calls to %s are suspended after %s consecutive failures; retry after %s" % (
+                            name, self.failures, time.strftime('%H:%M:%S', time.localtime(self.open_until))))
+                # let one trial call through
+                self.state = 'half_open'
+            elif self.state == 'half_open':
+                raise CircuitOpenError("Calls to %s are suspended while a trial call is running" % name)
+
+    def record(self, success):
+        with self._lock:
+            if success:
+                self.state = 'closed'
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.threshold:
+                self.state = 'open'
+                self.opened_at = time.time()
+
+    def reset(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+
+
+class BreakerRegistry:
+    """ Per-process breakers keyed by ``(dbname, connector_id)``, a worker serving several databases. """
+
+    def __init__(self):
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, threshold, cooldown):
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(threshold, cooldown)
+            breaker.threshold, breaker.cooldown = threshold, cooldown
+            return breaker
+
+    def peek(self, key):
+        return self._breakers.get(key)
+
+
+def guarded(send, name, policy, breaker=None):
+    """ Wrap ``send`` with the retry policy and, when given, the circuit breaker. """
+    def send_guarded(request_kwargs):
+        if breaker is not None:
+            breaker.before_call(name)
+        try:
+            r = policy.call(send, request_kwargs)
+        except Exception:
+            # whatever the error, a trial call must not leave the breaker half open
+            if breaker is not None:
+                breaker.record(success=False)
+            raise
+        if breaker is not None:
+            breaker.record(success=r.status_code < 500 and r.status_code not in policy.statuses)
+        return r
+    return send_guarded
+
+
+def guarded_async(send, name, policy, breaker=None):
+    """ guarded() for a coroutine function ``send``. """
+    async def send_guarded(request_kwargs):
+        if breaker is not None:
+            breaker.before_call(name)
+        try:
+            r = await policy.acall(send, request_kwargs)
+        except Exception:
+            # whatever the error, a trial call must not leave the breaker half open
+            if breaker is not None:
+                breaker.record(success=False)
+            raise
+        if breaker is not None:
+            breaker.record(success=r.status_code < 500 and r.status_code not in policy.statuses)
+        return r
+    return send_guarded
+
+
+breaker_registry = BreakerRegistry()
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+CacheEntry = namedtuple('CacheEntry', ['expires_at', 'etag', 'last_modified', 'payload'])
+
+
+class ResponseCache:
+    """ Bounded per-worker LRU of parsed GET responses. """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.revalidations = 0
+
+    @staticmethod
+    def make_key(dbname, connector_id, request_kwargs, flatten_mode=None):
+        """ Return ``(dbname, connector_id, digest)``; the digest alone identifies the entry in the shared table.
+
+        Payloads are cached flattened, so the flatten mode is part of the digest.
+        """
+        material = json.dumps([
+            connector_id,
+            flatten_mode,
+            request_kwargs.get('method'),
+            request_kwargs.get('url'),
+            sorted((request_kwargs.get('params') or {}).items()),
+            sorted((request_kwargs.get('headers') or {}).items()),
+            request_kwargs.get('data'),
+            request_kwargs.get('json'),
+        ], default=str)
+        return dbname, connector_id, hashlib.sha256(material.encode()).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def record_revalidation(self):
+        with self._lock:
+            self.revalidations += 1
+
+    def invalidate(self, keys=None):
+        with self._lock:
+            if keys is None:
+                self._entries.clear()
+            for key in keys or ():
+                self._entries.pop(key, None)
+
+    def invalidate_connectors(self, dbname, connector_ids):
+        """ Drop the entries of the given connectors of one database, leaving the other ones cached. """
+        connector_ids = set(connector_ids)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == dbname and key[1] in connector_ids]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'revalidations': self.revalidations,
+                'entries': len(self._entries),
+            }
+
+
+def is_fresh(entry):
+    return entry is not None and entry.expires_at > time.time()
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,29 @@
+def flatten_response(data, mode='merge', separator='.'):
+    """ Flatten a parsed JSON response without recursion.
+
+    ``merge`` keeps the historical behaviour: top-level keys are kept as they are and the dicts found in
+    lists are merged in, later items overriding earlier ones. ``path`` keys every leaf by its full path
+    (``items.0.id``). ``none`` returns the response untouched.
+    """
+    if mode == 'none':
+        return data
+    flat = {}
+    # the stack holds (path, value) pairs in reverse so items are visited in document order
+    stack = [((), data)]
+    while stack:
+        path, value = stack.pop()
+        if isinstance(value, dict):
+            if mode == 'merge' and path:
+                flat[path[-1]] = value
+                continue
+            stack.extend(((*path, key), item) for key, item in reversed(list(value.items())))
+        elif isinstance(value, list):
+            if mode == 'merge':
+                # list items are merged into the current level; the list's own key is not kept
+                parent = path[:-1]
+                stack.extend((parent, item) for item in reversed(value) if isinstance(item, (dict, list)))
+            else:
+                stack.extend(((*path, str(index)), item) for index, item in reversed(list(enumerate(value))))
+        elif path:
+            flat[path[-1] if mode == 'merge' else separator.join(path)] = value
+    return flat
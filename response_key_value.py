@@ -1,8 +1,11 @@
 from odoo import api, fields, models, _
 from odoo.exceptions import ValidationError
 
+from .response_path import compile_path
+
 class ResponseKeyValue(models.Model):
     _name = 'response.key.value'
+    _inherit = ['api.connector.line.mixin']
     _description = 'Response Key Value'
     response_key_id=fields.Many2one('api.connector', string='Related Server Action', ondelete='cascade')
     key = fields.Many2one('ir.model.fields', string='Field', required=True, ondelete='cascade')
@@ -15,4 +18,12 @@ class ResponseKeyValue(models.Model):
         if self.key.ttype in ('one2many', 'many2one', 'many2many'):
             raise ValidationError(f"You can only change Char, Float, and Integer fields. The following field(s) are invalid:\n\n {self.key.name}")
         if not self.key or not self.key.store:
-            raise ValidationError(f"You cannot change the following field(s), as they are not stored in the database:\n\n {self.key.name}")
\ No newline at end of file
+            raise ValidationError(f"You cannot change the following field(s), as they are not stored in the database:\n\n {self.key.name}")
+    @api.constrains('dynamic_value', 'take_from')
+    def _check_dynamic_value_path(self):
+        for line in self:
+            if line.take_from and line.response_key_id.flatten_mode == 'none':
+                try:
+                    compile_path(line.dynamic_value)
+                except ValueError as e:
+                    raise ValidationError(str(e))
@@ -0,0 +1,81 @@
+import re
+from functools import lru_cache
+
+WILDCARD = '*'
+
+_STEP = re.compile(r"""\.?([^.\[\]'"]+)|\[(\d+|\*|'[^']*'|"[^"]*")\]""")
+
+
+@lru_cache(maxsize=1024)
+def compile_path(expression):
+    """ Compile a dotted / JSONPath-like expression (``$.items[0].id``, ``items.*.id``) into a tuple of steps. """
+    expression = (expression or '').strip()
+    if expression.startswith('$'):
+        expression = expression[1:]
+    steps = []
+    position = 0
+    for match in _STEP.finditer(expression):
+        if match.start() != position:
+            break
+        name, bracket = match.groups()
+        if bracket is None:
+            steps.append(name)
+        elif bracket == WILDCARD:
+            steps.append(WILDCARD)
+        elif bracket[0] in '\'"':
+            steps.append(bracket[1:-1])
+        else:
+            steps.append(int(bracket))
+        position = match.end()
+    if position != len(expression):
+        raise ValueError("Invalid response path %r" % expression)
+    return tuple(steps)
+
+
+def _children(value, step):
+    """ Yield the values reached from ``value`` by one step, in document order. """
+    if step == WILDCARD:
+        if isinstance(value, list):
+            yield from value
+        elif isinstance(value, dict):
+            yield from value.values()
+    elif isinstance(value, list):
+        index = step if isinstance(step, int) else int(step) if step.isdigit() else None
+        if index is not None and -len(value) <= index < len(value):
+            yield value[index]
+    elif isinstance(value, dict):
+        key = str(step)
+        if key in value:
+            yield value[key]
+
+
+def extract_paths(data, compiled_paths):
+    """ Evaluate many compiled paths in one walk over ``data``, sharing common prefixes.
+
+    Returns a dict mapping each expression to its value, or to the list of matches when the path
+    contains a wildcard. Expressions that match nothing are left out.
+    """
+    trie = {}
+    for expression, steps in compiled_paths:
+        node = trie
+        for step in steps:
+            node = node.setdefault(step, {})
+        node.setdefault(None, []).append(expression)
+
+    matches = {}
+    stack = [(trie, data)]
+    while stack:
+        node, value = stack.pop()
+        for expression in node.get(None, ()):
+            matches.setdefault(expression, []).append(value)
+        for step, child in node.items():
+            if step is not None:
+                stack.extend((child, item) for item in reversed(list(_children(value, step))))
+
+    result = {}
+    for expression, steps in compiled_paths:
+        if WILDCARD in steps:
+            result[expression] = matches.get(expression, [])
+        elif expression in matches:
+            result[expression] = matches[expression][0]
+    return result
@@ -0,0 +1,22 @@
+from datetime import datetime, timezone
+
+
+def parse_watermark(value):
+    """ Return a sync mark as a comparable value: a number, a naive UTC datetime, or the text as a last resort.
+
+    Marks are stored as text; comparing them as text would order ``'9'`` after ``'10'`` or mix time zones.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, float(value))
+    text = str(value).strip()
+    try:
+        return (0, float(text))
+    except ValueError:
+        pass
+    try:
+        moment = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    except ValueError:
+        return (2, text)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return (1, moment)
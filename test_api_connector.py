@@ -1,13 +1,42 @@
-from odoo.tests.common import TransactionCase
+import base64
+import gzip
+import json
+import unittest
+from contextlib import nullcontext
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from odoo.tests.common import HttpCase, TransactionCase, tagged
 from odoo.exceptions import UserError
 
+from .async_transport import async_transport
+from .response_cache import CacheEntry, ResponseCache
+from .response_flattener import flatten_response
+from .response_path import compile_path, extract_paths
+from .sync_watermark import parse_watermark
+from .rate_limiter import RateLimiter, RateLimitExceeded, throttle_delay
+from .resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, guarded
+from .metrics import metrics_registry
+from .call_log import call_log_buffer, make_entry
+from .oauth_token import token_cache
+from .compression import ResponseTooLarge, prepare_outgoing
+from .execution_context import ExecutionContext
+from .mock_api_server import MockApiServer
+
 class TestApiConnector(TransactionCase):
 
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = MockApiServer().start()
+        cls.addClassCleanup(cls.server.stop)
+
     def setUp(self):
-        # super(TestApiConnector, self).setUp()
+        super().setUp()
+        self.base_url = self.server.url + '/api/activity'
         self.api_connector = self.env['api.connector'].create({
             'name': 'Test API Connector',
-            'url': 'https://www.boredapi.com/api/activity',
+            'url': self.base_url,
             'request_method': 'REST',
             'request_type': 'GET',
             'authorization': 'No Auth',
@@ -15,23 +44,23 @@ class TestApiConnector(TransactionCase):
     def test_send_request_success(self):
         # Test sending a successful request without authorization
         self.api_connector.send_request()
-        self.assertTrue(self.api_connector.response)
+        self.assertEqual(json.loads(self.api_connector.response)['status'], 'ok')
     def test_add_to_url(self):
         # Test AddToURL functionality
         add_to_url = self.env['add.to.url'].create({
             'api_connector_id': self.api_connector.id,
             'key': 'test_key',
-            'value': 'test_value',
+            'static_value': 'test_value',
         })
         url_to_call = self.api_connector._add_to_url(event_record=None)
-        self.assertEqual(url_to_call, 'https://www.boredapi.com/api/activity/test_value')
+        self.assertEqual(url_to_call, self.base_url + '/test_value')
 
     def test_api_header(self):
         # Test ApiHeader functionality
         api_header = self.env['api.header'].create({
             'api_connector_id': self.api_connector.id,
             'key': 'test_header_key',
-            'value': 'test_header_value',
+            'static_value': 'test_header_value',
         })
         headers_dict = self.api_connector._get_request_headers(event_record=None)
         self.assertEqual(headers_dict.get('test_header_key'), 'test_header_value')
@@ -41,7 +70,7 @@ class TestApiConnector(TransactionCase):
         api_parameter = self.env['api.parameter'].create({
             'api_connector_id': self.api_connector.id,
             'key': 'test_param_key',
-            'value': 'test_param_value',
+            'static_value': 'test_param_value',
         })
         params_dict = self.api_connector._get_request_parameters(event_record=None)
         self.assertEqual(params_dict.get('test_param_key'), 'test_param_value')
@@ -50,3 +79,518 @@ class TestApiConnector(TransactionCase):
         self.api_connector.url = 'invalid_url'
         with self.assertRaises(UserError):
             self.api_connector.send_request()
+
+    def test_session_reused_per_host(self):
+        # Test that connectors to the same host share one pooled session
+        stats_before = self.api_connector.get_pool_stats()
+        session = self.api_connector._get_session()
+        self.assertIs(self.api_connector._get_session(), session)
+        stats_after = self.api_connector.get_pool_stats()
+        self.assertGreaterEqual(stats_after['hits'], stats_before['hits'] + 1)
+
+    def test_deferred_job_dead_letter(self):
+        # Test that a failing deferred call is retried with backoff, then dead-lettered
+        self.api_connector.write({'execution_mode': 'deferred', 'job_max_attempts': 2})
+        job = self.env['api.connector.job']._enqueue(self.api_connector, 'res.partner', [self.env.user.partner_id.id])
+        self.assertEqual(job.state, 'pending')
+        job._schedule_retry("boom")
+        self.assertEqual((job.state, job.attempts), ('pending', 1))
+        job._schedule_retry("boom")
+        self.assertEqual(job.state, 'dead')
+
+    def test_deferred_jobs_bulk(self):
+        # Test that the pending jobs of a bulk connector go out as one bulk request
+        partners = self.env['res.partner'].create([{'name': 'Job A'}, {'name': 'Job B'}])
+        self.api_connector.write({
+            'request_type': 'POST',
+            'batch_mode': 'json_array',
+            'target_model_id': self.env['ir.model']._get('res.partner').id,
+            'fields_lines': [(0, 0, {
+                'key': self.env['ir.model.fields']._get('res.partner', 'ref').id,
+                'take_from': True,
+                'dynamic_value': 'status',
+            })],
+        })
+        jobs = self.env['api.connector.job']._enqueue(self.api_connector, 'res.partner', partners.ids)
+        calls_before = self.server.request_count
+        jobs._run()
+        self.assertEqual(self.server.request_count - calls_before, 1)
+        self.assertEqual(jobs.mapped('state'), ['done', 'done'])
+
+    def test_server_action_batched(self):
+        # Test that a connector server action run on several records sends them in one bulk request
+        partners = self.env['res.partner'].create([{'name': 'Action A'}, {'name': 'Action B'}])
+        self.api_connector.write({
+            'request_type': 'POST',
+            'batch_mode': 'json_array',
+            'target_model_id': self.env['ir.model']._get('res.partner').id,
+            'fields_lines': [(0, 0, {
+                'key': self.env['ir.model.fields']._get('res.partner', 'ref').id,
+                'take_from': True,
+                'dynamic_value': 'status',
+            })],
+        })
+        action_server = self.env['ir.actions.server'].create({
+            'name': 'Call connector',
+            'model_id': self.env['ir.model']._get('res.partner').id,
+            'state': 'code',
+            'is_connector_action': True,
+            'action_api_connector_id': self.api_connector.id,
+        })
+        calls_before = self.server.request_count
+        action_server.with_context(active_model='res.partner', active_ids=partners.ids,
+                                   active_id=partners[0].id).run()
+        self.assertEqual(self.server.request_count - calls_before, 1)
+        self.assertEqual(partners.mapped('ref'), ['ok', 'ok'])
+
+    def test_prepare_request(self):
+        # Test that a request is fully built before being dispatched
+        request_kwargs = self.api_connector._prepare_request(None)
+        self.assertEqual(request_kwargs['method'], 'GET')
+        self.assertEqual(request_kwargs['url'], self.base_url)
+
+    def test_request_template_invalidation(self):
+        # Test that the compiled request template follows header line changes
+        self.assertEqual(self.api_connector._get_request_headers(event_record=None), {})
+        header = self.env['api.header'].create({
+            'api_connector_id': self.api_connector.id,
+            'key': 'X-Test',
+            'static_value': 'one',
+        })
+        self.assertEqual(self.api_connector._get_request_headers(event_record=None), {'X-Test': 'one'})
+        header.static_value = 'two'
+        self.assertEqual(self.api_connector._get_request_headers(event_record=None), {'X-Test': 'two'})
+
+    def test_write_response_values_batch(self):
+        # Test that distinct mapped values are written to every record in one pass
+        partners = self.env['res.partner'].create([{'name': 'A'}, {'name': 'B'}])
+        self.api_connector.target_model_id = self.env['ir.model']._get('res.partner')
+        self.api_connector._write_response_values([(partners[0].id, {'ref': 'x'}), (partners[1].id, {'ref': 'y'})])
+        self.assertEqual(partners.mapped('ref'), ['x', 'y'])
+
+    def test_response_cache_lru(self):
+        # Test that the response cache evicts the least recently used entry
+        cache = ResponseCache(max_entries=2)
+        for key in ('a', 'b'):
+            cache.put(key, CacheEntry(0, None, None, {key: 1}))
+        cache.get('a')
+        cache.put('c', CacheEntry(0, None, None, {'c': 1}))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_response_cache_scope(self):
+        # Test that cache keys follow the flatten mode and that clearing a connector keeps the others cached
+        request_kwargs = {'method': 'GET', 'url': self.base_url}
+        key = ResponseCache.make_key('db', 1, request_kwargs, 'merge')
+        self.assertNotEqual(key, ResponseCache.make_key('db', 1, request_kwargs, 'path'))
+        cache = ResponseCache()
+        other_key = ResponseCache.make_key('db', 2, request_kwargs, 'merge')
+        for cache_key in (key, other_key):
+            cache.put(cache_key, CacheEntry(0, None, None, {}))
+        cache.invalidate_connectors('db', [1])
+        self.assertIsNone(cache.get(key))
+        self.assertIsNotNone(cache.get(other_key))
+
+    def test_oauth_token_cached(self):
+        # Test that a stored OAuth token is served from the process cache until it nears expiry
+        self.api_connector.authorization = 'O Auth 2'
+        self.api_connector._store_oauth_token({'access_token': 'abc', 'expires_in': 3600, 'refresh_token': 'r'})
+        self.assertEqual(self.api_connector._get_oauth_access_token(), 'abc')
+        self.assertTrue(self.api_connector.oauth_token_expiry)
+
+    def test_oauth_credentials_change_drops_token(self):
+        # Test that changing the OAuth credentials forgets the stored and the cached token
+        self.api_connector.authorization = 'O Auth 2'
+        self.api_connector._store_oauth_token({'access_token': 'abc', 'expires_in': 3600, 'refresh_token': 'r'})
+        self.api_connector.oauth_client_id = 'another-client'
+        self.assertFalse(self.api_connector._get_oauth_token_record())
+        self.assertIsNone(token_cache.get(self.api_connector._get_token_cache_key(),
+                                          self.api_connector._get_token_generation()))
+
+    def test_oauth_token_stale_generation(self):
+        # Test that a token cached before the registry caches were cleared is not served anymore
+        self.api_connector.authorization = 'O Auth 2'
+        self.api_connector._store_oauth_token({'access_token': 'abc'})
+        key = self.api_connector._get_token_cache_key()
+        self.assertEqual(token_cache.get(key, self.api_connector._get_token_generation()).access_token, 'abc')
+        self.api_connector.clear_caches()
+        self.assertIsNone(token_cache.get(key, self.api_connector._get_token_generation()))
+
+    def test_response_read_with_bin_size(self):
+        # Test that the stored response decompresses when read the way the form view does
+        self.api_connector._store_response({'code': 'C-1'})
+        self.api_connector.invalidate_recordset()
+        connector = self.api_connector.with_context(bin_size=True)
+        self.assertEqual(json.loads(connector.read(['response'])[0]['response']), {'code': 'C-1'})
+
+    def test_trigger_response_needs_full_response(self):
+        # Test that a truncated stored response is refused instead of failing to parse
+        self.api_connector.write({'response_storage': 'truncated', 'response_max_length': 5})
+        self.api_connector._store_response({'code': 'C-1', 'name': 'Long enough'})
+        with self.assertRaises(UserError):
+            self.api_connector.trigger_response()
+
+    def test_flatten_response(self):
+        # Test the iterative flattener on large payloads and with dotted key paths
+        payload = {'count': 2, 'items': [{'id': i} for i in range(50000)]}
+        self.assertEqual(flatten_response(payload), {'count': 2, 'id': 49999})
+        self.assertEqual(flatten_response({'a': {'b': [{'c': 1}]}}, mode='path'), {'a.b.0.c': 1})
+
+    def test_response_paths(self):
+        # Test that path expressions are evaluated in one walk over the structured response
+        response = {'data': {'items': [{'id': 1}, {'id': 2}], 'total': 2}}
+        paths = [(expression, compile_path(expression)) for expression in ('$.data.total', 'data.items[*].id')]
+        self.assertEqual(extract_paths(response, paths), {'$.data.total': 2, 'data.items[*].id': [1, 2]})
+
+    def test_page_number_pagination(self):
+        # Test that page numbers advance until a short page is returned
+        self.api_connector.write({
+            'pagination_mode': 'page',
+            'pagination_param': 'page',
+            'pagination_size_param': 'per_page',
+            'pagination_page_size': 2,
+            'pagination_items_path': 'results',
+        })
+        first = self.api_connector._paginate_request(self.api_connector._prepare_request(None), None)
+        self.assertEqual(first['params'], {'per_page': 2, 'page': 1})
+        second = self.api_connector._next_page_request(first, None, {'results': [{}, {}]})
+        self.assertEqual(second['params']['page'], 2)
+        self.assertIsNone(self.api_connector._next_page_request(second, None, {'results': [{}]}))
+
+    def test_offset_pagination(self):
+        # Test that offsets start at zero and a short page does not stop when the server picks the page size
+        self.api_connector.write({
+            'pagination_mode': 'offset',
+            'pagination_param': 'offset',
+            'pagination_page_size': 2,
+            'pagination_items_path': 'results',
+        })
+        first = self.api_connector._paginate_request(self.api_connector._prepare_request(None), None)
+        self.assertEqual(first['params'], {'offset': 0})
+        second = self.api_connector._next_page_request(first, None, {'results': [{}]})
+        self.assertEqual(second['params']['offset'], 1)
+        self.assertIsNone(self.api_connector._next_page_request(second, None, {'results': []}))
+        with self.assertRaises(UserError):
+            self.api_connector.request_method = 'GRAPHQL'
+
+    def test_sync_upsert_items(self):
+        # Test that synced items update matching records and create the others in one batch
+        partner = self.env['res.partner'].create({'name': 'Old', 'ref': 'EXT-1'})
+        self.api_connector.write({
+            'target_model_id': self.env['ir.model']._get('res.partner').id,
+            'sync_external_id_path': 'code',
+            'sync_external_id_field_id': self.env['ir.model.fields']._get('res.partner', 'ref').id,
+            'fields_lines': [(0, 0, {
+                'key': self.env['ir.model.fields']._get('res.partner', 'name').id,
+                'take_from': True,
+                'dynamic_value': 'label',
+            })],
+        })
+        self.api_connector._upsert_items([{'code': 'EXT-1', 'label': 'New'}, {'code': 'EXT-2', 'label': 'Other'}])
+        self.assertEqual(partner.name, 'New')
+        self.assertEqual(self.env['res.partner'].search([('ref', '=', 'EXT-2')]).name, 'Other')
+
+    def test_parse_watermark(self):
+        # Test that sync marks compare as numbers and instants rather than as text
+        self.assertGreater(parse_watermark('10'), parse_watermark('9'))
+        self.assertGreater(parse_watermark(10), parse_watermark('9.5'))
+        self.assertGreater(parse_watermark('2024-01-01T10:00:00+02:00'), parse_watermark('2024-01-01T07:30:00Z'))
+
+    def test_sync_upsert_archived_record(self):
+        # Test that a synced item updates its archived record instead of creating a duplicate
+        partner = self.env['res.partner'].create({'name': 'Old', 'ref': 'EXT-9', 'active': False})
+        self.api_connector.write({
+            'target_model_id': self.env['ir.model']._get('res.partner').id,
+            'sync_external_id_path': 'code',
+            'sync_external_id_field_id': self.env['ir.model.fields']._get('res.partner', 'ref').id,
+            'fields_lines': [(0, 0, {
+                'key': self.env['ir.model.fields']._get('res.partner', 'name').id,
+                'take_from': True,
+                'dynamic_value': 'label',
+            })],
+        })
+        self.api_connector._upsert_items([{'code': 'EXT-9', 'label': 'New'}])
+        self.assertEqual(partner.name, 'New')
+        self.assertEqual(self.env['res.partner'].with_context(active_test=False).search_count(
+            [('ref', '=', 'EXT-9')]), 1)
+
+    def test_throttle_delay(self):
+        # Test that Retry-After and rate limit headers are honoured
+        self.assertEqual(throttle_delay(SimpleNamespace(status_code=429, headers={'Retry-After': '7'})), 7.0)
+        self.assertEqual(throttle_delay(SimpleNamespace(
+            status_code=200, headers={'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '3'})), 3.0)
+        self.assertIsNone(throttle_delay(SimpleNamespace(status_code=200, headers={})))
+
+    @staticmethod
+    def _delete_limiter_rows(limiter):
+        # the limiter commits on its own cursors, outside of the test transaction
+        with limiter._cursor() as cr:
+            cr.execute("DELETE FROM api_connector_rate_bucket WHERE key = %s", [limiter.key])
+            cr.execute("DELETE FROM api_connector_rate_slot WHERE key = %s", [limiter.key])
+            cr.commit()
+
+    def test_rate_limiter_max_wait(self):
+        # Test that a throttled limiter fails once the wait would exceed its maximum instead of sleeping
+        limiter = RateLimiter(self.env.cr.dbname, 'test:max-wait', rate=1.0, max_in_flight=1, max_wait=1.0)
+        self.addCleanup(self._delete_limiter_rows, limiter)
+        limiter.acquire()
+        limiter.penalize(3600)
+        with self.assertRaises(RateLimitExceeded):
+            limiter.acquire()
+        with limiter.slot():
+            with self.assertRaises(RateLimitExceeded):
+                with limiter.slot():
+                    pass
+        with limiter.slot():
+            pass
+
+    def test_circuit_breaker(self):
+        # Test that the breaker opens after consecutive failures and closes after a successful trial
+        breaker = CircuitBreaker(threshold=2, cooldown=0)
+        breaker.record(success=False)
+        breaker.before_call('test')
+        breaker.record(success=False)
+        self.assertEqual(breaker.state, 'open')
+        breaker.before_call('test')
+        self.assertEqual(breaker.state, 'half_open')
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call('test')
+        breaker.record(success=True)
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_circuit_breaker_unexpected_error(self):
+        # Test that an unexpected error during the trial call reopens the breaker instead of leaving it half open
+        breaker = CircuitBreaker(threshold=1, cooldown=0)
+        breaker.record(success=False)
+
+        def send(request_kwargs):
+            raise KeyError('boom')
+        with self.assertRaises(KeyError):
+            guarded(send, 'test', RetryPolicy(), breaker)({'url': self.base_url})
+        self.assertEqual(breaker.state, 'open')
+
+    def test_metrics_flush(self):
+        # Test that worker histograms are added to the shared timing rows
+        dbname = self.env.cr.dbname
+        metrics_registry.observe(dbname, self.api_connector.id, 'prepare', 3.0)
+        metrics_registry.observe(dbname, self.api_connector.id, 'prepare', 30.0)
+        # the connector only exists in the test transaction: flush through the test cursor
+        Metric = self.env['api.connector.metric']
+        with patch.object(type(Metric), '_flush_cursor', lambda model: nullcontext(model.env.cr)):
+            Metric._flush_worker_metrics(force=True)
+        metric = self.env['api.connector.metric'].search([
+            ('connector_id', '=', self.api_connector.id), ('phase', '=', 'prepare')])
+        self.assertEqual(metric.count, 2)
+        self.assertEqual(metric.p50_ms, 5)
+
+    def test_call_log_flush(self):
+        # Test that buffered call logs are inserted in one batch with a compressed body
+        response = SimpleNamespace(status_code=500, content=b'{"error": "boom"}', url='https://example.com',
+                                   request=SimpleNamespace(body=None))
+        call_log_buffer.append(self.env.cr.dbname, make_entry(self.api_connector.id, {}, response, None, 12.0, 2048))
+        Call = self.env['api.connector.call']
+        with patch.object(type(Call), '_flush_cursor', lambda model: nullcontext(model.env.cr)):
+            Call._flush_worker_logs(force=True)
+        call = self.env['api.connector.call'].search([('connector_id', '=', self.api_connector.id)])
+        self.assertEqual(call.status_code, 500)
+        self.assertFalse(call.success)
+        self.assertEqual(call.body_text, '{"error": "boom"}')
+
+    def test_trigger_response_context(self):
+        # Test that mapped values reach the event record without writing on the connector
+        partner = self.env['res.partner'].create({'name': 'Event'})
+        self.api_connector.write({
+            'target_model_id': self.env['ir.model']._get('res.partner').id,
+            'fields_lines': [(0, 0, {
+                'key': self.env['ir.model.fields']._get('res.partner', 'ref').id,
+                'take_from': True,
+                'dynamic_value': 'code',
+            })],
+        })
+        self.api_connector.trigger_response(ExecutionContext(partner, {'code': 'C-1'}))
+        self.assertEqual(partner.ref, 'C-1')
+        self.assertFalse(self.api_connector.response_event_record)
+
+    def test_bulk_response_demultiplex(self):
+        # Test that bulk results are paired with their request items by key or by position
+        self.api_connector.write({'batch_mode': 'json_array', 'batch_response_path': 'results',
+                                  'batch_match_key': 'id'})
+        items = [{'id': 1}, {'id': 2}]
+        response = {'results': [{'id': 2, 'ok': False}, {'id': 1, 'ok': True}]}
+        paired = self.api_connector._demultiplex_bulk_response(items, response)
+        self.assertEqual([item['ok'] for item in paired], [True, False])
+        self.api_connector.batch_match_key = False
+        with self.assertRaises(UserError):
+            self.api_connector._demultiplex_bulk_response(items + [{'id': 3}], response)
+        with self.assertRaises(UserError):
+            self.api_connector.request_method = 'GRAPHQL'
+
+    def test_request_body_template(self):
+        # Test that body placeholders are filled from the event record and the template follows edits
+        partner = self.env['res.partner'].create({'name': 'Body "quoted"', 'ref': 'R1'})
+        self.api_connector.write({'request_type': 'POST', 'request_body': '{"name": {{ name }}, "ref": {{ ref }}}'})
+        body = self.api_connector._prepare_request(partner)['data']
+        self.assertEqual(json.loads(body), {'name': 'Body "quoted"', 'ref': 'R1'})
+        self.api_connector.write({'body_format': 'text', 'request_body': 'ref={{ ref }}'})
+        self.assertEqual(self.api_connector._prepare_request(partner)['data'], 'ref=R1')
+        self.api_connector.request_body = '{{ no_such_field }}'
+        with self.assertRaises(UserError):
+            self.api_connector._prepare_request(partner)
+
+    def test_template_empty_values(self):
+        # Test that empty fields are sent as null and GraphQL variables only exist with a variables template
+        partner = self.env['res.partner'].create({'name': 'No Ref'})
+        self.api_connector.write({'request_type': 'POST', 'request_body': '{"ref": {{ ref }}}'})
+        self.assertEqual(json.loads(self.api_connector._prepare_request(partner)['data']), {'ref': None})
+        self.api_connector.write({'request_method': 'GRAPHQL', 'request_body': 'query { items { id } }'})
+        self.assertEqual(self.api_connector._prepare_request(partner)['json'], {'query': 'query { items { id } }'})
+        self.api_connector.request_variables = '{"ref": {{ ref }}}'
+        self.assertEqual(self.api_connector._prepare_request(partner)['json']['variables'], {'ref': None})
+
+    def test_dynamic_values_bulk_read(self):
+        # Test that the dynamic line values of a recordset are read at once, relational fields as ids
+        country = self.env.ref('base.be')
+        partners = self.env['res.partner'].create([{'name': 'A', 'country_id': country.id}, {'name': 'B'}])
+        self.env['api.parameter'].create([{
+            'api_connector_id': self.api_connector.id,
+            'key': key,
+            'take_from_event_record': True,
+            'dynamic_value': self.env['ir.model.fields']._get('res.partner', field_name).id,
+        } for key, field_name in (('name', 'name'), ('country', 'country_id'))])
+        values_by_id = self.api_connector._get_dynamic_values(partners)
+        self.assertEqual(values_by_id[partners[0].id], ('A', country.id))
+        self.assertEqual(self.api_connector._get_request_parameters(partners[1], values_by_id[partners[1].id]),
+                         {'name': 'B', 'country': False})
+
+    def test_trigger_index(self):
+        # Test that the trigger index tells which writes can fire a trigger and follows trigger changes
+        Trigger = self.env['base.automation.api.trigger']
+        self.assertIsNone(Trigger._get_watched_fields('res.partner', 'write'))
+        trigger = Trigger.create({
+            'name': 'On ref change',
+            'model_id': self.env['ir.model']._get('res.partner').id,
+            'trigger': 'on_write',
+            'state': 'code',
+            'trigger_field_ids': [(6, 0, self.env['ir.model.fields']._get('res.partner', 'ref').ids)],
+        })
+        self.assertEqual(Trigger._get_watched_fields('res.partner', 'write'), (False, frozenset({'ref'})))
+        self.assertIsNone(Trigger._get_watched_fields('res.partner', 'create'))
+        trigger.active = False
+        self.assertIsNone(Trigger._get_watched_fields('res.partner', 'write'))
+
+    def test_trigger_fields_with_any_field_trigger(self):
+        # Test that a field trigger does not fire on writes of other fields when an any-field trigger exists
+        Trigger = self.env['base.automation.api.trigger']
+        partner_model = self.env['ir.model']._get('res.partner')
+        Trigger.create([{
+            'name': 'On any change',
+            'model_id': partner_model.id,
+            'trigger': 'on_write',
+            'state': 'code',
+            'code': "",
+        }, {
+            'name': 'On ref change',
+            'model_id': partner_model.id,
+            'trigger': 'on_write',
+            'state': 'code',
+            'code': "records.write({'function': 'fired'})",
+            'trigger_field_ids': [(6, 0, self.env['ir.model.fields']._get('res.partner', 'ref').ids)],
+            'filter_domain': "[('is_company', '=', False)]",
+        }])
+        partner = self.env['res.partner'].create({'name': 'Trigger Partner'})
+        partner.write({'comment': 'not watched'})
+        self.assertFalse(partner.function)
+        partner.write({'ref': 'R-1'})
+        self.assertEqual(partner.function, 'fired')
+
+    def test_import_postman_nested_folders(self):
+        # Test that requests of nested folders are imported with their lines in one pass
+        collection = {
+            'info': {'name': 'Import'},
+            'item': [
+                {'name': 'Top', 'request': {'method': 'GET', 'url': 'https://example.com/top', 'header': []}},
+                {'name': 'Folder', 'item': [{'name': 'Sub', 'item': [{'name': 'Deep', 'request': {
+                    'method': 'POST',
+                    'header': [{'key': 'X-Key', 'value': '1'}],
+                    'url': {'raw': 'https://example.com/deep?q=2', 'query': [{'key': 'q', 'value': '2'}]},
+                    'auth': {'type': 'bearer', 'bearer': [{'key': 'token', 'value': 'secret'}]},
+                }}]}]},
+            ],
+        }
+        wizard = self.env['import.postman.collection'].new({
+            'json_file_for_import': base64.b64encode(json.dumps(collection).encode()),
+        })
+        self.assertEqual(json.loads(wizard.json_data)['imported'], 2)
+        deep = self.env['api.connector'].search([('name', '=', 'Folder/Sub/Deep')])
+        self.assertEqual(deep.url, 'https://example.com/deep')
+        self.assertEqual(deep.bearer_token, 'secret')
+        self.assertEqual(deep.header_line.key, 'X-Key')
+        self.assertEqual(deep.parameter_line.static_value, '2')
+
+    def test_export_postman_url_object(self):
+        # Test that the streamed export lists lines read in bulk and uses the v2.1 URL object
+        self.env['api.parameter'].create({
+            'api_connector_id': self.api_connector.id,
+            'key': 'type',
+            'static_value': 'social',
+        })
+        self.api_connector.url = 'https://www.boredapi.com/api/activity'
+        wizard = self.env['export.postman.collection'].create({'schema_version': '2.1'})
+        collection = json.loads(wizard.get_export_data_text(self.api_connector.ids))
+        url = collection['item'][0]['request']['url']
+        self.assertEqual(url['host'], ['www', 'boredapi', 'com'])
+        self.assertEqual(url['path'], ['api', 'activity'])
+        self.assertEqual(url['query'], [{'key': 'type', 'value': 'social'}])
+        self.assertEqual(url['raw'], 'https://www.boredapi.com/api/activity?type=social')
+
+    @unittest.skipIf(not async_transport.available, "httpx is not installed")
+    def test_async_transport_batch(self):
+        # Test that a batch sent from the event loop gets one parsed response per record
+        self.api_connector.transport = 'async'
+        partners = self.env['res.partner'].create([{'name': 'A'}, {'name': 'B'}, {'name': 'C'}])
+        contexts = self.api_connector.send_request_batch(partners)
+        self.assertEqual([context.event_record for context in contexts], list(partners))
+        self.assertTrue(all(context.response_object['status'] == 'ok' for context in contexts))
+
+    def test_payload_size_and_compression(self):
+        # Test that bodies are gzipped on demand, oversized responses are abandoned and responses stored compressed
+        request_kwargs = prepare_outgoing({'method': 'POST', 'url': self.base_url, 'json': {'a': 1}}, 'gzip', True)
+        self.assertEqual(request_kwargs['headers']['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(request_kwargs['data'])), {'a': 1})
+        self.api_connector.send_request()
+        self.assertTrue(self.api_connector.response_compressed)
+        self.assertEqual(json.loads(self.api_connector.response)['path'], '/api/activity')
+        self.server.payload_size = 4096
+        self.addCleanup(setattr, self.server, 'payload_size', 0)
+        self.api_connector.max_response_size = 1
+        with self.assertRaises(ResponseTooLarge):
+            self.api_connector.send_request()
+
+    def test_metrics_flush_failure_keeps_samples(self):
+        # Test that a failing flush neither reaches the caller nor loses the drained histograms
+        dbname = self.env.cr.dbname
+        metrics_registry.drain(dbname)
+        metrics_registry.observe(dbname, self.api_connector.id, 'json', 1.0)
+        Metric = self.env['api.connector.metric']
+        with patch.object(type(Metric), '_write_histograms', side_effect=Exception("boom")):
+            Metric._flush_worker_metrics(force=True)
+        self.assertIn((self.api_connector.id, 'json'), metrics_registry.drain(dbname))
+
+
+@tagged('post_install', '-at_install')
+class TestApiConnectorHttp(HttpCase):
+
+    def test_export_postman_route(self):
+        # Test that the export route streams the collection of the wizard's connectors
+        connector = self.env['api.connector'].create({
+            'name': 'Exported Connector',
+            'url': 'https://example.com/api',
+            'request_method': 'REST',
+            'request_type': 'GET',
+            'authorization': 'No Auth',
+        })
+        wizard = self.env['export.postman.collection'].create({'connector_ids': [(6, 0, connector.ids)]})
+        self.authenticate('admin', 'admin')
+        response = self.url_open('/api_connector/export_postman/%s' % wizard.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['name'] for item in response.json()['item']], ['Exported Connector'])
@@ -0,0 +1,163 @@
+import base64
+import json
+import logging
+import os
+import time
+
+from odoo.tests.common import TransactionCase, tagged
+
+from .mock_api_server import MockApiServer
+
+_logger = logging.getLogger(__name__)
+
+
+def _env_list(name, default):
+    return [int(size) for size in os.environ.get(name, default).split(',') if size]
+
+
+# Run with --test-tags api_connector_benchmark; sizes and server behaviour come from the environment
+BENCH_SIZES = _env_list('API_CONNECTOR_BENCH_SIZES', '1,100,1000')
+BENCH_LATENCY = float(os.environ.get('API_CONNECTOR_BENCH_LATENCY', '0'))
+BENCH_PAYLOAD = int(os.environ.get('API_CONNECTOR_BENCH_PAYLOAD', '256'))
+BENCH_ERROR_RATE = float(os.environ.get('API_CONNECTOR_BENCH_ERROR_RATE', '0'))
+
+
+def percentile(durations, q):
+    if not durations:
+        return 0.0
+    ordered = sorted(durations)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@tagged('-standard', '-at_install', 'post_install', 'api_connector_benchmark')
+class BenchmarkApiConnector(TransactionCase):
+    """ Throughput, latency percentiles and SQL query counts of the request and trigger pipeline. """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = MockApiServer(latency=BENCH_LATENCY, payload_size=BENCH_PAYLOAD,
+                                   error_rate=BENCH_ERROR_RATE, seed=42).start()
+        cls.addClassCleanup(cls.server.stop)
+        cls.results = []
+        cls.addClassCleanup(cls._report)
+
+    @classmethod
+    def _report(cls):
+        _logger.info("%-28s %8s %6s %10s %9s %9s %9s %9s %9s %10s %7s", 'scenario', 'records', 'iters',
+                     'records/s', 'ms/rec', 'p50 ms', 'p95 ms', 'p99 ms', 'queries', 'queries/rec', 'errors')
+        for row in cls.results:
+            _logger.info("%-28s %8d %6d %10.1f %9.3f %9.2f %9.2f %9.2f %9d %10.2f %7d", *row)
+
+    def setUp(self):
+        super().setUp()
+        self.connector = self.env['api.connector'].create({
+            'name': 'Benchmark Connector',
+            'url': self.server.url + '/api/activity',
+            'request_method': 'REST',
+            'request_type': 'GET',
+            'authorization': 'No Auth',
+            'retry_on_errors': False,
+        })
+
+    def _measure(self, scenario, size, operations):
+        """ Run the operations, each a callable, and record their throughput, latencies and queries.
+
+        ``size`` is the number of records handled by all the operations together: a batch scenario is one
+        operation over ``size`` records, so rates are reported per record and latencies per operation.
+        Failed operations are counted; they fail the benchmark unless the mock server injects errors.
+        """
+        self.env.flush_all()
+        queries_before = self.env.cr.sql_log_count
+        durations = []
+        errors = 0
+        start = time.perf_counter()
+        for operation in operations:
+            operation_start = time.perf_counter()
+            try:
+                operation()
+            except Exception as e:
+                if not BENCH_ERROR_RATE:
+                    raise
+                # the mock server's error rate makes some calls fail on purpose
+                errors += 1
+                _logger.debug("%s: %s", scenario, e)
+            durations.append((time.perf_counter() - operation_start) * 1000)
+        self.env.flush_all()
+        elapsed = time.perf_counter() - start
+        queries = self.env.cr.sql_log_count - queries_before
+        self.results.append((scenario, size, len(operations), size / elapsed if elapsed else 0.0,
+                             elapsed * 1000 / size if size else 0.0, percentile(durations, 0.5),
+                             percentile(durations, 0.95), percentile(durations, 0.99), queries,
+                             queries / size if size else 0.0, errors))
+
+    def _create_partners(self, size):
+        return self.env['res.partner'].create([{'name': 'Bench %s' % index} for index in range(size)])
+
+    def _map_response_to_ref(self):
+        self.connector.write({
+            'target_model_id': self.env['ir.model']._get('res.partner').id,
+            'fields_lines': [(0, 0, {
+                'key': self.env['ir.model.fields']._get('res.partner', 'ref').id,
+                'take_from': True,
+                'dynamic_value': 'status',
+            })],
+        })
+
+    def _add_trigger(self):
+        trigger = self.env['base.automation.api.trigger'].create({
+            'name': 'Benchmark trigger',
+            'model_id': self.env['ir.model']._get('res.partner').id,
+            'trigger': 'on_create_or_write',
+            'state': 'code',
+            'trigger_field_ids': [(6, 0, self.env['ir.model.fields']._get('res.partner', 'ref').ids)],
+        })
+        self.connector.api_trigger_id = trigger
+        return trigger
+
+    def test_send_request(self):
+        for size in BENCH_SIZES:
+            self._measure('send_request', size, [self.connector._send_request] * size)
+
+    def test_batch_pipeline(self):
+        self._map_response_to_ref()
+        for size in BENCH_SIZES:
+            partners = self._create_partners(size)
+            self._measure('send_batch + trigger_response', size, [
+                lambda: self.connector.trigger_response_batch(self.connector.send_request_batch(partners))])
+
+    def test_bulk_pipeline(self):
+        self._map_response_to_ref()
+        self.connector.write({'request_type': 'POST', 'batch_mode': 'json_array'})
+        for size in BENCH_SIZES:
+            partners = self._create_partners(size)
+            self._measure('bulk + trigger_response', size, [
+                lambda: self.connector.trigger_response_batch(self.connector.send_request_bulk(partners))])
+
+    def test_trigger_hooks(self):
+        self._add_trigger()
+        for size in BENCH_SIZES:
+            partners = self._create_partners(size)
+            self._measure('write untriggered field', size,
+                          [lambda partner=partner: partner.write({'comment': 'x'}) for partner in partners])
+            self._measure('write trigger field', size,
+                          [lambda partner=partner: partner.write({'ref': 'R%s' % partner.id}) for partner in partners])
+            self._measure('create triggered', size, [lambda: self._create_partners(size)])
+
+    def test_postman_import_export(self):
+        for size in BENCH_SIZES:
+            collection = {'info': {'name': 'Benchmark'}, 'item': [{
+                'name': 'Bench request %s-%s' % (size, index),
+                'request': {
+                    'method': 'GET',
+                    'header': [{'key': 'X-Index', 'value': str(index)}],
+                    'url': {'raw': '%s/items?page=%s' % (self.server.url, index),
+                            'query': [{'key': 'page', 'value': str(index)}]},
+                },
+            } for index in range(size)]}
+            upload = base64.b64encode(json.dumps(collection).encode())
+            self._measure('postman import', size, [
+                lambda: self.env['import.postman.collection'].new({'json_file_for_import': upload}).json_data])
+            connector_ids = self.env['api.connector'].search([('name', '=like', 'Bench request %s-%%' % size)]).ids
+            wizard = self.env['export.postman.collection'].create({})
+            self._measure('postman export', size, [lambda: wizard.get_export_data_text(connector_ids)])